@@ -0,0 +1,84 @@
+"""
+Benchmark the PDF text backends in functions_and_classes/pdf_backends.py.
+
+Runs every available backend over a folder of PDFs and reports pages/sec and
+how closely each backend's text agrees with the reference backend (word
+multiset overlap, 1.0 = same words).  OCR is not involved; only the text
+layer is timed.
+
+    python benchmark_pdf_backends.py /path/to/pdf_folder --reference pdfplumber
+"""
+import sys
+import os
+import argparse
+import re
+import time
+from collections import Counter
+
+cwd = os.getcwd()
+parent_folder = os.path.abspath(os.path.join(cwd, ".."))
+if parent_folder not in sys.path:
+    sys.path.append(parent_folder)
+
+from functions_and_classes.pdf_backends import BACKENDS
+
+
+def word_agreement(text: str, reference: str) -> float:
+    words = Counter(re.findall(r"\w+", text.lower()))
+    ref_words = Counter(re.findall(r"\w+", reference.lower()))
+    if not words and not ref_words:
+        return 1.0
+    overlap = sum((words & ref_words).values())
+    return overlap / max(sum(words.values()), sum(ref_words.values()))
+
+
+def run_benchmark(folder: str, reference: str, limit: int = 0):
+    pdfs = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".pdf"))
+    if limit:
+        pdfs = pdfs[:limit]
+    if not pdfs:
+        raise ValueError(f"No PDF files found in {folder}")
+
+    results = {name: {"pages": 0, "seconds": 0.0, "failures": 0, "agreement": []} for name in BACKENDS}
+    reference_texts = {}
+
+    # Reference first so every other backend can be scored against it.
+    names = [reference] + [name for name in BACKENDS if name != reference]
+    for name in names:
+        backend = BACKENDS[name]
+        for path in pdfs:
+            start = time.perf_counter()
+            try:
+                pages = backend.extract_pages(path)
+            except Exception as e:
+                print(f"{name} failed on {os.path.basename(path)}: {e}")
+                results[name]["failures"] += 1
+                continue
+            results[name]["seconds"] += time.perf_counter() - start
+            results[name]["pages"] += len(pages)
+
+            text = "\n".join(pages)
+            if name == reference:
+                reference_texts[path] = text
+            elif path in reference_texts:
+                results[name]["agreement"].append(word_agreement(text, reference_texts[path]))
+
+    print(f"{len(pdfs)} PDFs, reference backend: {reference}")
+    print(f"{'backend':<12} {'pages':>7} {'seconds':>9} {'pages/sec':>10} {'agreement':>10} {'failures':>9}")
+    for name in names:
+        r = results[name]
+        pages_per_sec = r["pages"] / r["seconds"] if r["seconds"] else 0.0
+        agreement = 1.0 if name == reference else (
+            sum(r["agreement"]) / len(r["agreement"]) if r["agreement"] else 0.0
+        )
+        print(f"{name:<12} {r['pages']:>7} {r['seconds']:>9.2f} {pages_per_sec:>10.1f} {agreement:>10.3f} {r['failures']:>9}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare PDF text backends on a folder of PDFs.")
+    parser.add_argument("folder", help="folder of PDF files to use as the fixture corpus")
+    parser.add_argument("--reference", default="pdfplumber", choices=sorted(BACKENDS))
+    parser.add_argument("--limit", type=int, default=0, help="only use the first N PDFs")
+    args = parser.parse_args()
+    run_benchmark(args.folder, args.reference, args.limit)
@@ -34,15 +34,16 @@ agent = LLMAgent(model_name)
 
 async def extract_all_papers(extracted_q, unextracted_q):
     api = bioarxiv_api()
-    paper_metadata = api.get_all_papers(year_range_str , limit=3000)
-    print(len(paper_metadata))
+    # Stream the listing; later pages are fetched while earlier papers are processed
+    paper_metadata = api.iter_papers(year_range_str , limit=3000)
 
     # global paper_metadeta_approved_list, paper_metadeta_unextracted_list
     # paper_metadeta_approved_list = []
     # paper_metadeta_unextracted_list = []
     count = 0
 
-    for paper in paper_metadata:
+    # Each next() may wait on a listing page; keep that off the event loop.
+    while (paper := await asyncio.to_thread(next, paper_metadata, None)) is not None:
         doi_types = {
             'preprint_doi': f"https://www.biorxiv.org/content/{paper['preprint_doi']}v1",
             'published_doi': f"https://doi.org/{paper['published_doi']}"
@@ -183,6 +184,7 @@ async def extract_all_papers(extracted_q, unextracted_q):
             break 
     await extracted_q.put(None)  # Signal end of extraction for the writer
     await unextracted_q.put(None)  # Signal end of extraction for the writer
+    await close_shared_client()
 
 async def json_writer(file_path, queue): 
     first_row = await queue.get()
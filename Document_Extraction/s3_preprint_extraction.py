@@ -1,9 +1,9 @@
 import sys
 import os
+import argparse
 import json 
 from dotenv import load_dotenv
 import asyncio
-import pdfplumber
 import aiofiles
 import requests
 
@@ -18,11 +18,23 @@ if parent_folder not in sys.path:
 
 from functions_and_classes import  functions
 from functions_and_classes import bioarxiv_class
-from functions_and_classes.paper_to_doi import get_article_info_from_title
+from functions_and_classes.biorxiv_mirror import biorxiv_mirror
+from functions_and_classes.title_index import title_index
+from functions_and_classes.pdf_doi import fast_doi_stats, identify_biorxiv_doi
+from functions_and_classes.pdf_title import LAYOUT_TITLE_MIN_CONFIDENCE, layout_title_stats
+from functions_and_classes.crossref_client import crossref
+from functions_and_classes.metadata_cache import metadata_cache
 from LLM_Agent.llm_template import LLMAgent
-from functions_and_classes.pdf_resolver import PDFResolver
+from functions_and_classes.pdf_resolver import PDFResolver, landing_cache
+from functions_and_classes.pdf_cache import pdf_cache, sha256_of_file
+from functions_and_classes.pdf_parse_pool import parse_pool
+from functions_and_classes.pdf_text_cache import text_cache
+from functions_and_classes.pipeline import Stage, format_stage_stats, report_stages
+from functions_and_classes.run_manifest import RunManifest, repair_jsonl_tail
+from functions_and_classes.paper_state import PaperStateStore
+from functions_and_classes.rate_limit import host_limiter
 import re
-from typing import Optional
+from typing import Iterable, Optional
 load_dotenv()
 
 repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -36,8 +48,18 @@ for folder in (extract_save_folder, unextracted_save_folder, unknown_save_folder
 extract_file_name = os.path.join(extract_save_folder, "extracted_papers.jsonl")
 unextracted_file_name = os.path.join(unextracted_save_folder, "unextracted_papers.jsonl")
 unknown_file_name = os.path.join(unknown_save_folder, "unknown_papers.jsonl")
+output_files = {
+    "extracted": extract_file_name,
+    "unextracted": unextracted_file_name,
+    "unknown": unknown_file_name,
+}
+manifest = RunManifest(os.getenv("manifest_path", os.path.join(repo_root, "papers", "manifest.sqlite3")))
+paper_state = PaperStateStore(os.getenv("paper_state_path", os.path.join(repo_root, "papers", "paper_state.sqlite3")))
 
 max_llm_concurrency = int(os.getenv("max_llm_concurrency", 8))
+pipeline_report_every = float(os.getenv("pipeline_report_every", 60))
+writer_queue_size = int(os.getenv("writer_queue_size", 64))
+max_extracted_pairs = int(os.getenv("max_extracted_pairs", 1000))
 s3_preprint_path = os.getenv("s3_preprint_path")
 cleaning_prompt = """
  The following text is a *partial excerpt* from a research paper. Your task is to:
@@ -94,38 +116,43 @@ agent = LLMAgent(model_name)
 llm_semaphore = asyncio.Semaphore(max_llm_concurrency)
 
 async def retry_biorxiv(doi: str, preprint: bool):
+    # The local mirror answers in the same {"collection": [...]} shape as the API
+    local = biorxiv_mirror.lookup(doi, preprint)
+    if local is not None:
+        return local
     loop = asyncio.get_running_loop()
     for attempt in range(3):
         try:
-            return await loop.run_in_executor(None, biorxiv_api.request_specific_preprint, preprint, doi)
+            data = await loop.run_in_executor(None, biorxiv_api.request_specific_preprint, preprint, doi)
+            biorxiv_mirror.store("details" if preprint else "pubs", data.get("collection", []))
+            if not preprint and not data.get("collection"):
+                biorxiv_mirror.store_miss(doi)
+            if preprint:
+                # The mirror's signature only moves on a sync; index write-backs as they come.
+                title_index.add_records(data.get("collection", []))
+            return data
         except requests.RequestException:
             await asyncio.sleep(1 * (2 ** attempt))
     return None
 
 async def call_llm(system_prompt: str, user_prompt: str) -> str:
-    loop = asyncio.get_running_loop()
     async with llm_semaphore:
-        return await loop.run_in_executor(None, agent.one_turn, system_prompt, user_prompt)
-    
-async def process_pdf(path: str):
-    paper_chunks = []
-    loop = asyncio.get_running_loop()
-    try:
-        with pdfplumber.open(path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                try:
-                    page_text = page.extract_text() or ""
-                except Exception:
-                    continue
-                if not page_text.strip():
-                    continue
-                page_chunks = functions.chunk_text_by_char_limit(page_text, limit=7500)
-                page_chunks_cleaned = await asyncio.gather(*(call_llm(cleaning_prompt, c) for c in page_chunks))
-                paper_chunks.append(" ".join(page_chunks_cleaned))
-    except Exception:
-        return []
-    return paper_chunks
+        return await agent.one_turn_async(system_prompt, user_prompt)
     
+async def clean_page(page_text: str) -> str:
+    page_chunks = functions.chunk_text_by_char_limit(page_text, limit=7500)
+    page_chunks_cleaned = await asyncio.gather(*(call_llm(cleaning_prompt, c) for c in page_chunks))
+    return " ".join(page_chunks_cleaned)
+
+_resolvers = {}
+
+def pdf_resolver(selector_timeout: int) -> PDFResolver:
+    # One resolver per timeout for the whole run; they share the HTTP client
+    # and browser pool.
+    if selector_timeout not in _resolvers:
+        _resolvers[selector_timeout] = PDFResolver(selector_timeout=selector_timeout)
+    return _resolvers[selector_timeout]
+
 async def extract_text_with_pdf_resolver(doi: str, paper_id, selector_timeout:int) -> str: 
     """
         Resolve *doi* → PDF → text using the new async PDFResolver.
@@ -135,13 +162,12 @@ async def extract_text_with_pdf_resolver(doi: str, paper_id, selector_timeout:in
     • Extracts text with your existing `pdf_parser.extract_text_from_pdf_url`
     • Returns *None* if nothing could be extracted
     """
-    async with PDFResolver(selector_timeout= selector_timeout) as resolver: 
-        try:
-            pdf = await resolver.get_pdf(doi=doi, paper_id=paper_id)
-            return pdf
-        except resolver.CantDownload as exc: 
-            #print 
-            return {"url":exc.landing}
+    try:
+        pdf = await pdf_resolver(selector_timeout).get_pdf(doi=doi, paper_id=paper_id)
+        return pdf
+    except PDFResolver.CantDownload as exc: 
+        #print 
+        return {"url":exc.landing}
 
 def remove_newlines(text: str) -> str:
         """
@@ -177,262 +203,491 @@ def clean_title(raw: str) -> Optional[str]:
 
 counter = 0
 counter_lock = asyncio.Lock()
-async def extract_preprint_and_published_papers(extracted_q, unextracted_q, unknown_q):
-    global counter
-    loop = asyncio.get_event_loop()
+stop_event = asyncio.Event()
+
+
+class PaperJob:
+    """One preprint PDF moving through the stages below."""
+
+    def __init__(self, paper: str):
+        self.paper = paper
+        self.path = os.path.join(s3_preprint_path, paper)
+        self.sha256 = None
+        self.state = {}
+        self.pages = []
+        # Pages after the first, streamed from parse to clean; None ends it.
+        self.page_stream: Optional[asyncio.Queue] = None
+        self.parse_error: Optional[BaseException] = None
+        self.first_page_cleaned = ""
+        self.title = None
+        self.preprint_text = None
+        self.published_text = None
+        self.latest_preprint = None
+        self.latest_pub = None
+        self.url = None
+        # Where the paper ends up and which metadata goes with it; set by the
+        # lookup branch, read once both branches are done.
+        self.outcome = "unknown"
+        self.metadata = {}
+        self.branches = 1
+        self.failed = False
+        self.error = None
+
+
+def preprint_only_metadata(latest_preprint: Optional[dict]) -> dict:
+    latest_preprint = latest_preprint or {}
+    return {
+        "preprint_doi": latest_preprint.get('doi'),
+        "published_doi": None,
+        "published_journal": None,
+        "preprint_authors": latest_preprint.get('authors'),
+        "preprint_category": latest_preprint.get('category'),
+        "preprint_date": latest_preprint.get('date'),
+        "published_date": None,
+        "preprint_author_corresponding": latest_preprint.get('author_corresponding'),
+        "preprint_author_corresponding_institution": latest_preprint.get('author_corresponding_institution'),
+    }
+
+
+def published_metadata(latest_pub: dict) -> dict:
+    return {
+        "preprint_doi": latest_pub.get('preprint_doi'),
+        "published_doi": latest_pub.get('published_doi'),
+        "published_journal": latest_pub.get('published_journal'),
+        "preprint_authors": latest_pub.get('preprint_authors'),
+        "preprint_category": latest_pub.get('preprint_category'),
+        "preprint_date": latest_pub.get('preprint_date'),
+        "published_date": latest_pub.get('published_date'),
+        "preprint_author_corresponding": latest_pub.get('preprint_author_corresponding'),
+        "preprint_author_corresponding_institution": latest_pub.get('preprint_author_corresponding_institution'),
+    }
+
+
+def build_paper_dict(job: PaperJob) -> dict:
+    paper_dict = {
+        "preprint_pdf_name": job.paper,
+        "preprint_doi": "",
+        "published_doi": "",
+        "published_journal": "",
+        "preprint_title": "",
+        "preprint_authors": "",
+        "preprint_category": "",
+        "preprint_date": "",
+        "published_date": "",
+        "preprint_author_corresponding": "",
+        "preprint_author_corresponding_institution": "",
+        "preprint_paper": "",
+        "published_paper": "",
+        'url': None
+    }
+    if job.failed:
+        paper_dict["error"] = job.error
+    if job.title is None:
+        # Nothing usable came out of the PDF.
+        return paper_dict
+    paper_dict.update(preprint_only_metadata(None))
+    paper_dict.update(job.metadata)
+    paper_dict.update({
+        "preprint_title": job.title,
+        "preprint_paper": job.preprint_text,
+        "published_paper": job.published_text if job.outcome == "extracted" else None,
+        "url": job.url,
+    })
+    return paper_dict
+
+
+class PaperPipeline:
+    """
+    parse → title ─┬─ clean (rest of the preprint) ──────────────┬─ emit
+                   └─ lookup → resolve → clean_published ────────┘
+
+    Both branches start once the title is known (taken from bioRxiv when the
+    DOI could be read off the PDF, else from the first-page layout, else
+    from the LLM); the paper is written when
+    the second one finishes.  Parsing streams: page 1 reaches the title
+    stage as soon as it is read and later pages flow to clean through
+    ``job.page_stream`` while the parse continues.  A paper whose stage
+    raised is still written, to the unknown/unextracted file with an
+    ``error`` field.  Worker counts and queue sizes come from env
+    (``stage_<name>_workers``, ``stage_queue_size``).  LLM calls across all
+    stages still share ``llm_semaphore``.
+    """
 
-    for paper in os.listdir(s3_preprint_path):
-        if paper.endswith(".pdf"):
-            paper_path = os.path.join(s3_preprint_path, paper)
-        else:
-            print(f"Skipping {paper}, not a PDF file.")
-            continue
-        print(f"Processing paper: {paper}")
-        research_text_bucket = {
-            "preprint_paper": None,
-            "published_paper": None
-                }
-        paper_dict = {
-            "preprint_pdf_name": paper,
-            "preprint_doi": "",
-            "published_doi": "",
-            "published_journal": "",
-            "preprint_title": "",
-            "preprint_authors": "",
-            "preprint_category": "",
-            "preprint_date": "",
-            "published_date": "",
-            "preprint_author_corresponding": "",
-            "preprint_author_corresponding_institution": "",
-            "preprint_paper": "",
-            "published_paper": "",
-            'url': None
+    def __init__(self, extracted_q, unextracted_q, unknown_q, max_pairs: Optional[int] = max_extracted_pairs):
+        self.max_pairs = max_pairs
+        self.out_queues = {
+            "extracted": extracted_q,
+            "unextracted": unextracted_q,
+            "unknown": unknown_q,
         }
-        
-        
-        preprint_chunks = await process_pdf(paper_path) 
-        if not preprint_chunks: 
-            await unknown_q.put(paper_dict); continue   
-        preprint_cleaned_text = " ".join(preprint_chunks)
-        research_text_bucket.update({
-            "preprint_paper": preprint_cleaned_text
-        })
-        intro_paragraph = str(preprint_chunks[0])
-        intro_paragraph_cleaned = remove_newlines(intro_paragraph)
-        
-        paper_title  = await call_llm(title_prompt, intro_paragraph_cleaned)
-        paper_title_cleaned = clean_title(paper_title)
-
-        if paper_title_cleaned == "Title not found":
-            print(f"Title not found for {paper_path}")
-            #extract preprint and save it to unknown_preprints folder
-            paper_dict.update({
-                "preprint_pdf_name": paper,
-                "preprint_doi": None,
-                "published_doi":None,
-                "published_journal": None,
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": None,
-                "preprint_category": None,
-                "preprint_date": None,
-                "published_date": None,
-                "preprint_author_corresponding": None,
-                "preprint_author_corresponding_institution": None,
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None
-            })
-            await unknown_q.put(paper_dict)
-            continue
-        
-        print(f"Paper Title Found , {paper_title_cleaned} ")
-        preprint_info = get_article_info_from_title(paper_title_cleaned)
-        
-        if preprint_info is None or preprint_info.get("doi") is None:
-            print(f"Could not find preprint doi for {paper_title_cleaned}")
-            #save it to unknown_preprints folder
-            paper_dict.update({
-                'preprint_pdf_name': paper,
-                "preprint_doi": None,
-                "published_doi":None,
-                "published_journal": None,
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": None,
-                "preprint_category": None,
-                "preprint_date": None,
-                "published_date": None,
-                "preprint_author_corresponding": None,
-                "preprint_author_corresponding_institution": None,
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None
-            })
-            await unknown_q.put(paper_dict)
-            continue
-        
-        print(f"Preprint DOI found: {preprint_info['doi']}, proceeding with extraction")
-        preprint_doi = preprint_info.get("doi")
-        preprint_paper_metadata = await retry_biorxiv(preprint_doi, preprint=True)
-        preprint_coll = (preprint_paper_metadata or {}).get("collection", [])
-        if not preprint_coll:
-            print(f"preprint info was not found on biorxiv")
-            paper_dict.update({
-                'preprint_pdf_name': paper,
-                "preprint_doi": None,
-                "published_doi":None,
-                "published_journal": None,
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": None,
-                "preprint_category": None,
-                "preprint_date": None,
-                "published_date": None,
-                "preprint_author_corresponding": None,
-                "preprint_author_corresponding_institution": None,
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None
-            })
-            await unknown_q.put(paper_dict)
-            continue
-        print("preprint info found on biorxiv")
-        latest_preprint = preprint_coll[-1]
-        published_doi = latest_preprint.get('published')
-        
-        if published_doi == "NA":
-            print("Preprint has not been published yet, storing preprint")
-            #store its metadata information and save it to unextracted_papers
-            paper_dict.update({
-                'preprint_pdf_name': paper,
-                "preprint_doi": latest_preprint.get('doi'),
-                "published_doi":None,
-                "published_journal": None,
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": latest_preprint.get('authors'),
-                "preprint_category": latest_preprint.get('category'),
-                "preprint_date": latest_preprint.get('date'),
-                "published_date": None,
-                "preprint_author_corresponding": latest_preprint.get('author_corresponding'),
-                "preprint_author_corresponding_institution": latest_preprint.get('author_corresponding_institution'),
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None
-            })
-            await unextracted_q.put(paper_dict)
-            continue        
-        
-        published_paper_metadata = await retry_biorxiv(published_doi, preprint=False)
-        published_coll = (published_paper_metadata or {}).get("collection", [])
-        if not published_coll:
-            print(f"published info was not found on biorxiv for {paper_title_cleaned} storing preprint")
-            paper_dict.update({
-                'preprint_pdf_name': paper,
-                "preprint_doi": latest_preprint.get('doi'),
-                "published_doi":None,
-                "published_journal": None,
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": latest_preprint.get('authors'),
-                "preprint_category": latest_preprint.get('category'),
-                "preprint_date": latest_preprint.get('date'),
-                "published_date": None,
-                "preprint_author_corresponding": latest_preprint.get('author_corresponding'),
-                "preprint_author_corresponding_institution": latest_preprint.get('author_corresponding_institution'),
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None
-            })
-            await unextracted_q.put(paper_dict)
-            continue
-        print("published info found on biorxiv")
-        latest_pub = published_coll[0]
-        confirmed_published_doi = latest_pub.get('published_doi')        
-        published_text = None
-        url = None
+        self.open_jobs = 0
+        self.all_done = asyncio.Event()
+
+        queue_size = int(os.getenv("stage_queue_size", 16))
+
+        def stage(name, handler, default_workers):
+            workers = int(os.getenv(f"stage_{name}_workers", default_workers))
+            return Stage(name, handler, workers, maxsize=queue_size, on_error=self.on_error)
+
+        self.parse = stage("parse", self.handle_parse, parse_pool.max_workers)
+        self.title_stage = stage("title", self.handle_title, max_llm_concurrency)
+        self.clean = stage("clean", self.handle_clean, max_llm_concurrency)
+        self.lookup = stage("lookup", self.handle_lookup, 16)
+        self.resolve = stage("resolve", self.handle_resolve, 4)
+        self.clean_published = stage("clean_published", self.handle_clean_published, max_llm_concurrency)
+        self.stages = [self.parse, self.title_stage, self.clean, self.lookup, self.resolve, self.clean_published]
+
+    def checkpoint(self, job: PaperJob, **values):
+        job.state.update(values)
+        paper_state.save(job.paper, **values)
+
+    async def handle_parse(self, job: PaperJob):
+        job.state = paper_state.load(job.paper)
+        job.sha256 = job.state.get("sha256") or await asyncio.to_thread(sha256_of_file, job.path)
+        if "pages" in job.state:
+            job.pages = job.state["pages"]
+            if not job.pages:
+                await self.branch_done(job)
+                return
+            await self.title_stage.put(job)
+            return
+
+        # The first page goes to the title stage as soon as it is parsed; the
+        # rest are streamed to the clean stage while parsing continues.
+        pages = []
+        job.page_stream = asyncio.Queue()
         try:
-            published_result = await extract_text_with_pdf_resolver(doi = confirmed_published_doi, paper_id= confirmed_published_doi, selector_timeout=40_000 )
-            if isinstance(published_result, dict) and 'url' in published_result: 
-                #log failure 
-                published_text = None
-                url = published_result['url']
-            else: 
-                published_text = published_result
-        except asyncio.TimeoutError as e:
-            print("Async timeout fetching published PDF for %s: %s", paper, e)
+            async for _, page_text in parse_pool.iter_pdf_pages(job.path):
+                if not page_text.strip():
+                    continue
+                pages.append(page_text)
+                if len(pages) == 1:
+                    job.pages = [page_text]
+                    await self.title_stage.put(job)
+                else:
+                    job.page_stream.put_nowait(page_text)
         except Exception as e:
-            print(f"Error extracting published paper: {e}")
-        if published_text:
-            print("Successfully extracted published paper")
-            published_chunks = functions.chunk_text_by_char_limit(published_text, limit=7500)
-        
-            
-            published_cleaned_chunks = await asyncio.gather(*(call_llm(cleaning_prompt, c) for c in published_chunks))
-            published_cleaned_text = " ".join(published_cleaned_chunks)
-            research_text_bucket.update({
-                "published_paper" : published_cleaned_text
-            })
-            paper_dict.update({
-            'preprint_pdf_name': paper,
-            "preprint_doi": latest_pub.get('preprint_doi'),
-            "published_doi": latest_pub.get('published_doi'),
-            "published_journal": latest_pub.get('published_journal'),
-            "preprint_title": paper_title_cleaned,
-            "preprint_authors": latest_pub.get('preprint_authors'),
-            "preprint_category": latest_pub.get('preprint_category'),
-            "preprint_date": latest_pub.get('preprint_date'),
-            "published_date": latest_pub.get('published_date'),
-            "preprint_author_corresponding": latest_pub.get('preprint_author_corresponding'),
-            "preprint_author_corresponding_institution": latest_pub.get('preprint_author_corresponding_institution'),
-            "preprint_paper": research_text_bucket["preprint_paper"],
-            "published_paper": research_text_bucket["published_paper"]
-            })
-        
-            await extracted_q.put(paper_dict)
-            async with counter_lock:
-                counter += 1
-            print(f"preprint and published extracted for {paper_title_cleaned}")
-            print(f"Total papers extracted so far: {counter}")
-
-            if counter == 1000: 
-                break
-        else:
+            print(f"Could not parse {job.path}: {e}")
+            job.parse_error = e
+        finally:
+            job.page_stream.put_nowait(None)
+
+        if job.parse_error is None:
+            self.checkpoint(job, sha256=job.sha256, pages=pages)
+        if not pages:
+            await self.branch_done(job)
+
+    async def handle_title(self, job: PaperJob):
+        if "title" not in job.state:
+            await self.identify_fast(job)
+        if "title" not in job.state:
+            title, confidence = await parse_pool.layout_title(job.path)
+            if title and confidence >= LAYOUT_TITLE_MIN_CONFIDENCE:
+                print(f"Title read from the first-page layout of {job.paper} (confidence {confidence})")
+                self.checkpoint(job, title=title)
+        if "title" not in job.state:
+            # The title prompt has always seen the cleaned first page.
+            first_page_cleaned = await clean_page(job.pages[0])
+            paper_title = await call_llm(title_prompt, remove_newlines(first_page_cleaned))
+            self.checkpoint(job, first_page_cleaned=first_page_cleaned, title=clean_title(paper_title))
+        job.first_page_cleaned = job.state.get("first_page_cleaned", "")
+        job.title = job.state["title"]
+
+        if job.title == "Title not found":
+            print(f"Title not found for {job.path}")
+            await self.clean.put(job)
+            return
+        print(f"Paper Title Found , {job.title} ")
+        job.branches = 2
+        await self.clean.put(job)
+        await self.lookup.put(job)
+
+    async def identify_fast(self, job: PaperJob):
+        """
+        Take the bioRxiv DOI straight from the PDF metadata / first page and
+        the title from bioRxiv, skipping the title LLM call and the title
+        search.  Leaves the state alone when either is missing.
+        """
+        found = await asyncio.to_thread(identify_biorxiv_doi, job.path, job.pages[0])
+        if found is None:
+            return
+        doi, source = found
+        preprint_coll = ((await retry_biorxiv(doi, preprint=True)) or {}).get("collection", [])
+        if not preprint_coll or not preprint_coll[-1].get("title"):
+            print(f"DOI {doi} from {source} of {job.paper} not found on biorxiv, asking the LLM for the title")
+            return
+        print(f"Preprint DOI {doi} read from {source} of {job.paper}")
+        self.checkpoint(job, fast_doi=doi, title=preprint_coll[-1]["title"],
+                        preprint_doi=doi, latest_preprint=preprint_coll[-1])
+
+    async def handle_clean(self, job: PaperJob):
+        if "preprint_text" not in job.state:
+            # The fast DOI and layout paths leave the first page for this stage.
+            pages = job.pages[1:] if job.first_page_cleaned else job.pages
+            tasks = [asyncio.create_task(clean_page(page)) for page in pages]
+            try:
+                if job.page_stream is not None:
+                    # Clean pages as the parse stage hands them over.
+                    while (page := await job.page_stream.get()) is not None:
+                        tasks.append(asyncio.create_task(clean_page(page)))
+                if job.parse_error is not None:
+                    raise RuntimeError(f"parsing stopped part way: {job.parse_error}")
+                cleaned = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            if job.first_page_cleaned:
+                cleaned = [job.first_page_cleaned, *cleaned]
+            self.checkpoint(job, preprint_text=" ".join(cleaned))
+        job.preprint_text = job.state["preprint_text"]
+        job.pages = []
+        job.page_stream = None
+        await self.branch_done(job)
+
+    async def handle_lookup(self, job: PaperJob):
+        # Misses are not checkpointed: a later retry should ask again.
+        if "latest_preprint" not in job.state:
+            if job.state.get("fast_doi"):
+                preprint_info = {"doi": job.state["fast_doi"]}
+            else:
+                preprint_info = title_index.best_match(job.title)
+                if preprint_info is not None:
+                    print(f"Local title index matched {job.title!r} (score {preprint_info['score']})")
+                else:
+                    preprint_info = await crossref.article_info_from_title(job.title)
+            if preprint_info is None or preprint_info.get("doi") is None:
+                print(f"Could not find preprint doi for {job.title}")
+                await self.branch_done(job)
+                return
+
+            print(f"Preprint DOI found: {preprint_info['doi']}, proceeding with extraction")
+            preprint_paper_metadata = await retry_biorxiv(preprint_info.get("doi"), preprint=True)
+            preprint_coll = (preprint_paper_metadata or {}).get("collection", [])
+            if not preprint_coll:
+                print(f"preprint info was not found on biorxiv")
+                await self.branch_done(job)
+                return
+            print("preprint info found on biorxiv")
+            self.checkpoint(job, preprint_doi=preprint_info.get("doi"), latest_preprint=preprint_coll[-1])
+        job.latest_preprint = job.state["latest_preprint"]
+        job.outcome = "unextracted"
+        job.metadata = preprint_only_metadata(job.latest_preprint)
+
+        published_doi = job.latest_preprint.get('published')
+        if published_doi == "NA":
+            print("Preprint has not been published yet, storing preprint")
+            await self.branch_done(job)
+            return
+
+        if "latest_pub" not in job.state:
+            published_paper_metadata = await retry_biorxiv(published_doi, preprint=False)
+            published_coll = (published_paper_metadata or {}).get("collection", [])
+            if not published_coll:
+                print(f"published info was not found on biorxiv for {job.title} storing preprint")
+                await self.branch_done(job)
+                return
+            print("published info found on biorxiv")
+            self.checkpoint(job, latest_pub=published_coll[0])
+        job.latest_pub = job.state["latest_pub"]
+        job.metadata = published_metadata(job.latest_pub)
+        await self.resolve.put(job)
+
+    async def handle_resolve(self, job: PaperJob):
+        confirmed_published_doi = job.latest_pub.get('published_doi')
+        published_text = job.state.get("published_raw")
+        if not published_text:
+            try:
+                published_result = await extract_text_with_pdf_resolver(doi = confirmed_published_doi, paper_id= confirmed_published_doi, selector_timeout=40_000 )
+                if isinstance(published_result, dict) and 'url' in published_result: 
+                    #log failure 
+                    job.url = published_result['url']
+                    self.checkpoint(job, url=job.url)
+                else: 
+                    published_text = published_result
+                    if published_text:
+                        self.checkpoint(job, published_raw=published_text)
+            except asyncio.TimeoutError as e:
+                print(f"Async timeout fetching published PDF for {job.paper}: {e}")
+            except Exception as e:
+                print(f"Error extracting published paper: {e}")
+
+        if not published_text:
             print(f"Could not extract text from {confirmed_published_doi}, storing preprint only")
-            paper_dict.update({
-                'preprint_pdf_name': paper,
-                "preprint_doi": latest_pub.get('preprint_doi'),
-                "published_doi": latest_pub.get('published_doi'),
-                "published_journal": latest_pub.get('published_journal'),
-                "preprint_title": paper_title_cleaned,
-                "preprint_authors": latest_pub.get('preprint_authors'),
-                "preprint_category": latest_pub.get('preprint_category'),
-                "preprint_date": latest_pub.get('preprint_date'),
-                "published_date": latest_pub.get('published_date'),
-                "preprint_author_corresponding": latest_pub.get('preprint_author_corresponding'),
-                "preprint_author_corresponding_institution": latest_pub.get('preprint_author_corresponding_institution'),
-                "preprint_paper": research_text_bucket["preprint_paper"],
-                "published_paper": None, 
-                "url": url
-                })
-            await unextracted_q.put(paper_dict)
-            continue 
-            
-        
-async def writer(path, queue):
+            await self.branch_done(job)
+            return
+        print("Successfully extracted published paper")
+        job.published_text = published_text
+        await self.clean_published.put(job)
+
+    async def handle_clean_published(self, job: PaperJob):
+        if "published_text" not in job.state:
+            published_chunks = functions.chunk_text_by_char_limit(job.published_text, limit=7500)
+            published_cleaned_chunks = await asyncio.gather(*(call_llm(cleaning_prompt, c) for c in published_chunks))
+            self.checkpoint(job, published_text=" ".join(published_cleaned_chunks))
+        job.published_text = job.state["published_text"]
+        job.outcome = "extracted"
+        await self.branch_done(job)
+
+    async def on_error(self, job: PaperJob, exc: BaseException):
+        print(f"Unexpected error processing {job.paper}: {exc}")
+        job.failed = True
+        job.error = f"{type(exc).__name__}: {exc}"
+        await self.branch_done(job)
+
+    async def branch_done(self, job: PaperJob):
+        job.branches -= 1
+        if job.branches != 0:
+            # Other branch still running, or the paper was already emitted.
+            return
+        try:
+            if job.failed and job.outcome == "extracted":
+                # A failed branch means part of the pair is missing.
+                job.outcome = "unextracted"
+            await self.emit(job)
+        finally:
+            self.open_jobs -= 1
+            if self.open_jobs == 0:
+                self.all_done.set()
+
+    async def emit(self, job: PaperJob):
+        global counter
+        paper_dict = build_paper_dict(job)
+        if job.outcome != "extracted":
+            await self.out_queues[job.outcome].put((paper_dict, job.sha256))
+            return
+
+        # Take a slot under the lock so papers finishing together cannot
+        # push the output past the cap.
+        async with counter_lock:
+            if self.max_pairs is not None and counter >= self.max_pairs:
+                print(f"Pair cap reached, not writing {job.title}")
+                return
+            counter += 1
+            if self.max_pairs is not None and counter >= self.max_pairs:
+                stop_event.set()
+            await self.out_queues["extracted"].put((paper_dict, job.sha256))
+        print(f"preprint and published extracted for {job.title}")
+        print(f"Total papers extracted so far: {counter}")
+
+    async def run(self, papers: Iterable[str]):
+        for stage in self.stages:
+            stage.start()
+        monitor = asyncio.create_task(report_stages(self.stages, every=pipeline_report_every))
+        try:
+            for paper in papers:
+                if stop_event.is_set():
+                    break
+                print(f"Processing paper: {paper}")
+                self.open_jobs += 1
+                self.all_done.clear()
+                await self.parse.put(PaperJob(paper))
+            if self.open_jobs:
+                await self.all_done.wait()
+        finally:
+            monitor.cancel()
+            for stage in self.stages:
+                await stage.stop()
+        print(format_stage_stats(self.stages))
+
+
+def new_papers():
+    done = manifest.done_names()
+    skipped = 0
+    for paper in os.listdir(s3_preprint_path):
+        if not paper.endswith(".pdf"):
+            print(f"Skipping {paper}, not a PDF file.")
+            continue
+        if paper in done:
+            skipped += 1
+            continue
+        yield paper
+    print(f"Skipped {skipped} papers already in the manifest.")
+
+
+# Checkpoint keys each stage produces, and the stages a rerun of one
+# invalidates along with it.
+STAGE_KEYS = {
+    "parse": ["sha256", "pages"],
+    "title": ["first_page_cleaned", "title", "fast_doi"],
+    "clean": ["preprint_text"],
+    "lookup": ["preprint_doi", "latest_preprint", "latest_pub"],
+    "resolve": ["url", "published_raw"],
+    "clean_published": ["published_text"],
+}
+DOWNSTREAM = {
+    "parse": list(STAGE_KEYS),
+    "title": ["title", "clean", "lookup", "resolve", "clean_published"],
+    "clean": ["clean"],
+    "lookup": ["lookup", "resolve", "clean_published"],
+    "resolve": ["resolve", "clean_published"],
+    "clean_published": ["clean_published"],
+}
+
+
+def papers_to_retry(outcome: str, from_stage: str):
+    """Papers last written as *outcome*, with checkpoints from *from_stage* on dropped."""
+    keys = [key for stage in DOWNSTREAM[from_stage] for key in STAGE_KEYS[stage]]
+    papers = manifest.names_with_outcome(outcome)
+    for paper in papers:
+        paper_state.drop(paper, keys)
+    print(f"Retrying {len(papers)} {outcome} papers from the {from_stage} stage")
+    return papers
+
+
+async def extract_preprint_and_published_papers(extracted_q, unextracted_q, unknown_q, papers=None):
+    if papers is None:
+        await PaperPipeline(extracted_q, unextracted_q, unknown_q).run(new_papers())
+    else:
+        # Retries are not held to the pair cap; they only finish work already started.
+        await PaperPipeline(extracted_q, unextracted_q, unknown_q, max_pairs=None).run(papers)
+
+async def writer(path, queue, outcome):
+    # The manifest row is written only after the record is flushed, so a
+    # paper is never marked done without its line in the output file.
+    dropped = repair_jsonl_tail(path)
+    if dropped:
+        print(f"Dropped a partial {dropped}-byte record at the end of {path}")
     async with aiofiles.open(path, 'a') as f:
         while True:
             item = await queue.get()
             if item is None:
                 break
-            await f.write(json.dumps(item) + "\n")
+            paper_dict, pdf_sha256 = item
+            await f.write(json.dumps(paper_dict) + "\n")
+            await f.flush()
+            manifest.mark(paper_dict["preprint_pdf_name"], pdf_sha256, outcome, path)
 
-async def main():
+async def main(retry: Optional[str] = None, from_stage: str = "resolve"):
+    global counter
 
-    
-    extracted_q = asyncio.Queue()
-    unextracted_q = asyncio.Queue()
-    unknown_q = asyncio.Queue()
+    if not manifest.done_names():
+        for outcome, path in output_files.items():
+            added = manifest.backfill_from_jsonl(path, outcome)
+            if added:
+                print(f"Manifest: backfilled {added} {outcome} papers from {path}")
+    # The pair cap counts pairs from earlier runs too.
+    counter = manifest.stats().get("extracted", 0)
+    papers = papers_to_retry(retry, from_stage) if retry else None
+    if papers is None and counter >= max_extracted_pairs:
+        print(f"Already have {counter} extracted pairs, nothing to do.")
+        return
+
+    # Load (or rebuild after a mirror sync) the local title index off the event loop
+    await asyncio.get_running_loop().run_in_executor(None, title_index.ensure_built)
+
+    extracted_q = asyncio.Queue(maxsize=writer_queue_size)
+    unextracted_q = asyncio.Queue(maxsize=writer_queue_size)
+    unknown_q = asyncio.Queue(maxsize=writer_queue_size)
     
     
     extract_task = asyncio.create_task(
-        extract_preprint_and_published_papers(extracted_q, unextracted_q, unknown_q)
+        extract_preprint_and_published_papers(extracted_q, unextracted_q, unknown_q, papers)
     )
     
-    writer_task1 = asyncio.create_task(writer(extract_file_name, extracted_q))
-    writer_task2 = asyncio.create_task(writer(unextracted_file_name, unextracted_q))
-    writer_task3 = asyncio.create_task(writer(unknown_file_name, unknown_q))
+    writer_task1 = asyncio.create_task(writer(extract_file_name, extracted_q, "extracted"))
+    writer_task2 = asyncio.create_task(writer(unextracted_file_name, unextracted_q, "unextracted"))
+    writer_task3 = asyncio.create_task(writer(unknown_file_name, unknown_q, "unknown"))
 
 
     await extract_task
@@ -443,9 +698,37 @@ async def main():
     
     
     await asyncio.gather(writer_task1, writer_task2, writer_task3)
+    await PDFResolver.shutdown()
+    await crossref.aclose()
+    await agent.aclose()
+    parse_pool.shutdown()
+    await asyncio.get_running_loop().run_in_executor(None, title_index.flush)
+    if retry:
+        # Retried papers were written again; keep only their latest record.
+        for path in output_files.values():
+            dropped = manifest.compact_output(path)
+            if dropped:
+                print(f"Dropped {dropped} superseded records from {path}")
 
     print(f"Completed extraction of {counter} papers.")
+    print(f"PDF cache: {pdf_cache.stats()}")
+    print(f"Text cache: {text_cache.stats()}")
+    print(f"Landing cache: {landing_cache.stats()}")
+    print(f"Manifest: {manifest.stats()}")
+    print(f"Rate limiter: {host_limiter.stats()}")
+    print(f"Metadata cache: {metadata_cache.stats()}")
+    print(f"bioRxiv mirror: {biorxiv_mirror.stats()}")
+    print(f"Title index: {len(title_index)} titles")
+    print(f"Fast DOI path: {fast_doi_stats.snapshot()}")
+    print(f"Layout titles: {layout_title_stats.snapshot()}")
+    print(f"LLM cache: {agent.cache_stats()}")
     
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Extract preprint/published paper pairs from s3_preprint_path.")
+    parser.add_argument("--retry", choices=sorted(output_files),
+                        help="re-run papers last written with this outcome instead of new papers")
+    parser.add_argument("--from-stage", default="resolve", choices=list(STAGE_KEYS),
+                        help="with --retry: drop checkpoints from this stage on and recompute them")
+    args = parser.parse_args()
+    asyncio.run(main(args.retry, args.from_stage))
     print("Extraction completed. Check the output files for results.")
@@ -0,0 +1,41 @@
+"""
+Fill or refresh the local bioRxiv metadata mirror (functions_and_classes/biorxiv_mirror.py)
+that s3_preprint_extraction.py checks before calling the bioRxiv API.
+
+    python sync_biorxiv_mirror.py --from 2019-01-01 --to 2021-12-31
+    python sync_biorxiv_mirror.py --refresh          # newer dates since the last sync
+"""
+import sys
+import os
+import argparse
+import logging
+import time
+
+cwd = os.getcwd()
+parent_folder = os.path.abspath(os.path.join(cwd, ".."))
+if parent_folder not in sys.path:
+    sys.path.append(parent_folder)
+
+from functions_and_classes.biorxiv_mirror import LISTINGS, biorxiv_mirror
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync bioRxiv details/pubs listings into the local mirror.")
+    parser.add_argument("--from", dest="start", help="First date to sync (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", default=None, help="Last date to sync (default: today)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Sync each listing from its last synced date instead of --from")
+    parser.add_argument("--listing", choices=LISTINGS, action="append",
+                        help="Only sync this listing (repeatable; default: both)")
+    args = parser.parse_args()
+    if not args.refresh and not args.start:
+        parser.error("--from is required unless --refresh is given")
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    if args.refresh:
+        counts = biorxiv_mirror.refresh(end=args.end, listings=args.listing or LISTINGS)
+    else:
+        counts = biorxiv_mirror.sync(args.start, args.end, listings=args.listing or LISTINGS)
+    print(f"Stored {counts} in {time.perf_counter() - started:.1f}s")
+    print(f"bioRxiv mirror: {biorxiv_mirror.stats()}")
@@ -1,8 +1,14 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+import httpx
 import os
+import json
+import hashlib
 import requests
 from dotenv import load_dotenv
 import asyncio
+import logging
+from functions_and_classes.pdf_cache import cache_root
+from functions_and_classes.ttl_cache import MISSING, SQLiteTTLCache
 load_dotenv()
 
 base_url = os.getenv('url')
@@ -13,7 +19,18 @@ class LLMAgent:
     def __init__(self, 
                  model_name,
                  base_url = os.getenv('url'),
-                 api_key=None):
+                 api_key=None,
+                 cache=None,
+                 cache_path=None,
+                 cache_max_mb=None):
+        """
+        cache: keep responses in a persistent SQLite cache keyed by a hash of
+            (model, system prompt, user prompt, temperature, stop).  Off unless
+            True or the ``llm_cache`` env variable is set to 1/true.
+        cache_path: defaults to ``<cache_dir>/llm_responses.sqlite3``.
+        cache_max_mb: size cap, least recently used entries are evicted first
+            (default ``llm_cache_max_mb`` env, 2048).
+        """
 
         if api_key is None: 
             api_key = os.getenv('OPENAI_API_KEY')
@@ -30,6 +47,105 @@ class LLMAgent:
 
         )
 
+        # The async client is built on first use, inside the loop that uses it
+        self._async_client = None
+        self._async_loop = None
+
+        if cache is None:
+            cache = os.getenv('llm_cache', '').lower() in ('1', 'true', 'yes')
+        self.cache = None
+        if cache:
+            if cache_max_mb is None:
+                cache_max_mb = float(os.getenv('llm_cache_max_mb', 2048))
+            self.cache = SQLiteTTLCache(
+                cache_path or os.path.join(cache_root, 'llm_responses.sqlite3'),
+                max_bytes=int(cache_max_mb * 1024 * 1024),
+            )
+
+    def async_client(self):
+        """
+        AsyncOpenAI client on a pooled httpx.AsyncClient, so concurrent
+        requests cost no threads.  Pool size and timeouts come from env:
+        ``llm_max_connections`` (default 100), ``llm_max_keepalive`` (20),
+        ``llm_connect_timeout`` (10 s) and ``llm_timeout`` (600 s, per read).
+        A client is bound to the event loop that created it and is rebuilt
+        for a new one; the old client's pool is closed on its own loop first.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is not loop:
+            self._release_stale_client()
+        if self._async_client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv('llm_max_connections', 100)),
+                    max_keepalive_connections=int(os.getenv('llm_max_keepalive', 20)),
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(
+                    float(os.getenv('llm_timeout', 600)),
+                    connect=float(os.getenv('llm_connect_timeout', 10)),
+                ),
+            )
+            self._async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=int(os.getenv('llm_max_retries', 2)),
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def _release_stale_client(self):
+        old_client, old_loop = self._async_client, self._async_loop
+        self._async_client = self._async_loop = None
+        if old_loop.is_running():
+            # Still serving another thread: close the pool there.
+            asyncio.run_coroutine_threadsafe(old_client.close(), old_loop)
+        else:
+            # Its sockets belong to a loop that no longer runs; they cannot
+            # be closed from here.
+            logging.warning(
+                "LLMAgent: previous async client was not closed before its event loop "
+                "stopped; call aclose() before the loop ends"
+            )
+
+    async def aclose(self):
+        """Close the async client's connection pool."""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+            self._async_loop = None
+
+    def request_kwargs(self, system_prompt, user_prompt, temperature, stop):
+        """Arguments for chat.completions.create, shared by the sync and async paths."""
+        kwargs = dict(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=temperature,
+        )
+        if stop:
+            kwargs["stop"] = stop
+        return kwargs
+
+    def cache_key(self, system_prompt, user_prompt, temperature, stop):
+        payload = json.dumps([self.model_name, system_prompt, user_prompt, temperature, stop])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def cached_response(self, key, use_cache=True):
+        """The stored response for *key*, or MISSING (also when caching is off or bypassed)."""
+        if self.cache is None or not use_cache:
+            return MISSING
+        return self.cache.lookup('llm', key)
+
+    def cache_stats(self):
+        """Hits / misses of this run, or None when caching is off."""
+        if self.cache is None:
+            return None
+        return self.cache.stats().get('llm', {"hits": 0, "misses": 0, "hit_rate": 0.0})
+
 
 
     def unload_and_load_model(self, model_name = None): 
@@ -66,28 +182,26 @@ class LLMAgent:
                 system_prompt, 
                 user_prompt,
                 temperature=0.7,
-                stop=None
+                stop=None,
+                use_cache=True
                 ):
+        """
+        One chat completion.  With the cache on, identical inputs are answered
+        from it; use_cache=False skips the cache for this call.
+        """
+        key = self.cache_key(system_prompt, user_prompt, temperature, stop)
+        response = self.cached_response(key, use_cache)
+        if response is MISSING:
+            response = self._complete(system_prompt, user_prompt, temperature, stop)
+            if self.cache is not None and use_cache:
+                self.cache.put('llm', key, response)
+        return response
+
+    def _complete(self, system_prompt, user_prompt, temperature, stop):
     # Create a chat completion
-        if not stop:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=temperature,
-            )
-        else:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=temperature,
-                stop=stop,
-            )
+        response = self.client.chat.completions.create(
+            **self.request_kwargs(system_prompt, user_prompt, temperature, stop)
+        )
         return response.choices[0].message.content
     
     
@@ -95,7 +209,8 @@ class LLMAgent:
                     system_prompt,
                     user_prompts,
                     temperature=0.7,
-                    stop=None):
+                    stop=None,
+                    use_cache=True):
         """
         Synchronous batch: calls one_turn sequentially for each prompt.
         """
@@ -105,7 +220,8 @@ class LLMAgent:
                 system_prompt=system_prompt,
                 user_prompt=prompt,
                 temperature=temperature,
-                stop=stop
+                stop=stop,
+                use_cache=use_cache
             )
             results.append(res)
         return results
@@ -114,31 +230,39 @@ class LLMAgent:
                             system_prompt,
                             user_prompt,
                             temperature=0.7,
-                            stop=None):
+                            stop=None,
+                            use_cache=True):
         """
-        Async wrapper for one_turn using a thread executor.
+        Async one_turn on the pooled AsyncOpenAI client.  Cancelling the
+        awaiting task aborts the HTTP request and frees its connection.
+        Cache reads and writes run in a worker thread, off the event loop.
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None,
-            self.one_turn,
-            system_prompt,
-            user_prompt,
-            temperature,
-            stop
+        caching = self.cache is not None and use_cache
+        key = self.cache_key(system_prompt, user_prompt, temperature, stop)
+        if caching:
+            response = await asyncio.to_thread(self.cached_response, key)
+            if response is not MISSING:
+                return response
+        completion = await self.async_client().chat.completions.create(
+            **self.request_kwargs(system_prompt, user_prompt, temperature, stop)
         )
+        response = completion.choices[0].message.content
+        if caching:
+            await asyncio.to_thread(self.cache.put, 'llm', key, response)
+        return response
 
     async def batch_one_turn_async(self,
                                     system_prompt,
                                     user_prompts,
                                     temperature=0.7,
-                                    stop=None):
+                                    stop=None,
+                                    use_cache=True):
         """
         True async batch: schedules one_turn_async calls concurrently.
         """
         tasks = [
             asyncio.create_task(
-                self.one_turn_async(system_prompt, prompt, temperature, stop)
+                self.one_turn_async(system_prompt, prompt, temperature, stop, use_cache)
             )
             for prompt in user_prompts
         ]
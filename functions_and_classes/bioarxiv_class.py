@@ -1,51 +1,131 @@
 import urllib3
 import json
 import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+from functions_and_classes.rate_limit import limited_call
+
+PAGE_SIZE = 100
 
 
 class bioarxiv_api: 
 
-    def __init__(self):
-        self.http = urllib3.PoolManager()
+    def __init__(self, listing_concurrency: Optional[int] = None):
+        self.listing_concurrency = listing_concurrency or int(os.getenv("biorxiv_listing_concurrency", 4))
+        # One pool slot per listing worker so concurrent pages don't queue on a connection
+        self.http = urllib3.PoolManager(maxsize=max(self.listing_concurrency, 1))
 
-    def request_papers(self , call_type:str , year_range:str , cursor:str):
-        endpoint = f"https://api.biorxiv.org/pubs/biorxiv/{year_range}"
+    def request_papers(self , call_type:str , year_range:str , cursor:str, listing:str = "pubs"):
+        endpoint = f"https://api.biorxiv.org/{listing}/biorxiv/{year_range}"
         if cursor: 
             endpoint += f"/{cursor}"
-        response = self.http.request(call_type ,endpoint)
+        response = limited_call(endpoint, lambda: self.http.request(call_type ,endpoint))
         decoded_response = response.data.decode("utf-8")
         return json.loads(decoded_response)
     
     def get_all_papers(self , year_range:str , limit: int): 
 
-        all_metadata = []
         if not limit:
             raise ValueError("You must specify a limit when simulating cursor manually.")
 
-        pages = (limit + 99) //100
-        
-        for i in range(pages):
-            cursor = str(i*100)
+        all_metadata = list(self.iter_papers(year_range, limit=limit))
+        logging.info(f"Successfully extracted {len(all_metadata)} papers (limit={limit}).")
+        return all_metadata
 
-            data = self.request_papers("GET" , year_range , cursor)
-            batch = data.get('collection' , [])
+    @staticmethod
+    def _total(data: dict) -> Optional[int]:
+        messages = data.get('messages') or [{}]
+        try:
+            return int(messages[0].get('total'))
+        except (TypeError, ValueError):
+            return None
 
-            if not batch:
-                logging.info(f"Successfully extracted {len(all_metadata)} papers (limit={limit}).") 
-                break 
+    @staticmethod
+    def load_cursor(cursor_file: str, year_range: str) -> int:
+        try:
+            with open(cursor_file, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        return int(saved.get("cursor", 0)) if saved.get("year_range") == year_range else 0
 
-            all_metadata.extend(batch)
+    @staticmethod
+    def save_cursor(cursor_file: str, year_range: str, cursor: int):
+        tmp = cursor_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"year_range": year_range, "cursor": cursor}, f)
+        os.replace(tmp, cursor_file)
 
-            if len(all_metadata) >= limit:
-                break
+    def iter_papers(self, year_range: str, limit: Optional[int] = None, cursor: Optional[int] = None,
+                    cursor_file: Optional[str] = None, listing: str = "pubs") -> Iterator[dict]:
+        """
+        Stream the *listing* (``pubs`` or ``details``) for *year_range*
+        record by record, keeping up to ``listing_concurrency`` cursor pages
+        in flight (each request still goes through the api.biorxiv.org host
+        limit).
 
-        return all_metadata
+        Records come out in cursor order.  With *cursor_file* the offset of
+        the next unconsumed page is saved once every record of a page has been
+        taken, and a later call for the same range resumes from there; an
+        explicit *cursor* overrides the saved one.
+        """
+        if cursor is None:
+            cursor = self.load_cursor(cursor_file, year_range) if cursor_file else 0
+        if cursor:
+            logging.info(f"Resuming {year_range} listing at cursor {cursor}")
+
+        def fetch(offset: int) -> dict:
+            return self.request_papers("GET", year_range, str(offset), listing)
+
+        yielded = 0
+        executor = ThreadPoolExecutor(max_workers=max(self.listing_concurrency, 1),
+                                      thread_name_prefix="biorxiv-listing")
+        try:
+            # The first page tells us the total, which bounds what we prefetch.
+            first = fetch(cursor)
+            total = self._total(first)
+            next_offset = cursor + PAGE_SIZE
+            pending = deque()
+
+            def fill():
+                nonlocal next_offset
+                while len(pending) < self.listing_concurrency:
+                    if total is not None and next_offset >= total:
+                        return
+                    if limit is not None and next_offset - cursor >= limit:
+                        return
+                    pending.append((next_offset, executor.submit(fetch, next_offset)))
+                    next_offset += PAGE_SIZE
+
+            offset, data = cursor, first
+            while True:
+                fill()
+                batch = data.get('collection', [])
+                if not batch:
+                    break
+
+                for record in batch:
+                    yield record
+                    yielded += 1
+                    if limit is not None and yielded >= limit:
+                        return
+
+                if cursor_file:
+                    self.save_cursor(cursor_file, year_range, offset + len(batch))
+                if not pending:
+                    break
+                offset, future = pending.popleft()
+                data = future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     def request_specific_preprint(self,preprint:bool, doi:str):
         if preprint: 
             endpoint = f"https://api.biorxiv.org/details/biorxiv/{doi}"
         else: 
             endpoint = f"https://api.biorxiv.org/pubs/biorxiv/{doi}"
-        response = self.http.request("GET", endpoint)
+        response = limited_call(endpoint, lambda: self.http.request("GET", endpoint))
         decoded_response = response.data.decode("utf-8")
         return json.loads(decoded_response)
\ No newline at end of file
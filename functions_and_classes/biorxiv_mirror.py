@@ -0,0 +1,251 @@
+"""
+biorxiv_mirror.py
+=================
+
+Local copy of the bioRxiv ``details`` and ``pubs`` listings, keyed by DOI,
+so the per‑paper lookups in the s3 pipeline are SQLite reads instead of two
+API round trips.
+
+```python
+biorxiv_mirror.sync("2023-01-01", "2023-12-31")   # bulk load a date range
+biorxiv_mirror.refresh()                           # newer dates since the last sync
+data = biorxiv_mirror.lookup(doi, preprint=True)   # {"collection": [...]} or None
+```
+
+``lookup`` returns the same shape as ``bioarxiv_api.request_specific_preprint``:
+every version of a preprint (oldest first) for ``preprint=True``, the
+preprint → published mapping matched on either DOI for ``preprint=False``.
+Records fetched from the API are written back with :meth:`store`, so the
+mirror also fills in for DOIs outside the synced ranges.
+
+Rows are upserts, so re‑syncing an overlapping range is harmless.  Each
+listing remembers the last date it was synced to; :meth:`refresh` starts a
+day before that.  Empty ``pubs`` answers from the API are kept for
+``biorxiv_pubs_miss_ttl_days`` (env, default 7) via :meth:`store_miss`, so
+``lookup`` answers ``{"collection": []}`` for them instead of asking again.
+The path comes from ``biorxiv_mirror_path`` (env, default
+``<cache_dir>/biorxiv_mirror.sqlite3``).  Use sync_biorxiv_mirror.py in
+Document_Extraction to run a sync from the command line.
+"""
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, Optional, Tuple
+
+from functions_and_classes.bioarxiv_class import bioarxiv_api
+from functions_and_classes.metadata_cache import normalise_doi
+from functions_and_classes.pdf_cache import cache_root
+
+LISTINGS = ("details", "pubs")
+
+PUBS_MISS_TTL = float(os.getenv("biorxiv_pubs_miss_ttl_days", 7)) * 86400
+
+
+class BiorxivMirror:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS details ("
+            " doi TEXT NOT NULL, version INTEGER NOT NULL, date TEXT, record TEXT NOT NULL,"
+            " PRIMARY KEY (doi, version));"
+            "CREATE TABLE IF NOT EXISTS pubs ("
+            " preprint_doi TEXT NOT NULL, published_doi TEXT NOT NULL, published_date TEXT,"
+            " record TEXT NOT NULL, PRIMARY KEY (preprint_doi, published_doi));"
+            "CREATE INDEX IF NOT EXISTS pubs_published ON pubs(published_doi);"
+            "CREATE TABLE IF NOT EXISTS sync_state ("
+            " listing TEXT PRIMARY KEY, synced_to TEXT NOT NULL, synced_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS pubs_misses ("
+            " doi TEXT PRIMARY KEY, checked_at REAL NOT NULL);"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    # ------------------------------------------------------------------ #
+    # Lookups
+    # ------------------------------------------------------------------ #
+    def lookup(self, doi: str, preprint: bool) -> Optional[dict]:
+        """
+        Mirrored records for *doi*, or None when the API has to be asked.  A
+        recent ``pubs`` miss recorded by :meth:`store_miss` answers
+        ``{"collection": []}``.
+        """
+        key = normalise_doi(doi)
+        with self._lock:
+            if preprint:
+                rows = self._db.execute(
+                    "SELECT record FROM details WHERE doi = ? ORDER BY version", (key,)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT record FROM pubs WHERE preprint_doi = ? OR published_doi = ?", (key, key)
+                ).fetchall()
+                if not rows and self._recent_miss(key):
+                    self.hits += 1
+                    return {"collection": []}
+        if not rows:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"collection": [json.loads(row[0]) for row in rows]}
+
+    def _recent_miss(self, key: str) -> bool:
+        # Caller holds self._lock.
+        row = self._db.execute("SELECT checked_at FROM pubs_misses WHERE doi = ?", (key,)).fetchone()
+        return row is not None and time.time() - row[0] < PUBS_MISS_TTL
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+    def store(self, listing: str, records: Iterable[dict]) -> int:
+        """Upsert *listing* records (as returned by the API); returns how many were kept."""
+        if listing == "details":
+            rows = [
+                (normalise_doi(r["doi"]), int(r.get("version") or 1), r.get("date"), json.dumps(r))
+                for r in records if r.get("doi")
+            ]
+            sql = "INSERT OR REPLACE INTO details (doi, version, date, record) VALUES (?, ?, ?, ?)"
+        elif listing == "pubs":
+            rows = [
+                (normalise_doi(r.get("preprint_doi") or r.get("biorxiv_doi")),
+                 normalise_doi(r["published_doi"]), r.get("published_date"), json.dumps(r))
+                for r in records
+                if (r.get("preprint_doi") or r.get("biorxiv_doi")) and r.get("published_doi")
+            ]
+            sql = "INSERT OR REPLACE INTO pubs (preprint_doi, published_doi, published_date, record) VALUES (?, ?, ?, ?)"
+        else:
+            raise ValueError(f"Unknown bioRxiv listing: {listing}")
+        if rows:
+            with self._lock:
+                self._db.execute("BEGIN")
+                self._db.executemany(sql, rows)
+                self._db.execute("COMMIT")
+        return len(rows)
+
+    def store_miss(self, doi: str):
+        """Remember that the ``pubs`` API had nothing for *doi*."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pubs_misses (doi, checked_at) VALUES (?, ?)",
+                (normalise_doi(doi), time.time()),
+            )
+
+    # ------------------------------------------------------------------ #
+    # Sync
+    # ------------------------------------------------------------------ #
+    def synced_to(self, listing: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT synced_to FROM sync_state WHERE listing = ?", (listing,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, start: str, end: Optional[str] = None, listings: Iterable[str] = LISTINGS,
+             api: Optional[bioarxiv_api] = None, batch_size: int = 1000) -> dict:
+        """
+        Pull every record of *listings* between *start* and *end* (YYYY-MM-DD,
+        *end* defaults to today).  A per‑range cursor file next to the mirror
+        lets an interrupted sync pick up where it stopped.
+        """
+        end = end or datetime.date.today().isoformat()
+        api = api or bioarxiv_api()
+        year_range = f"{start}/{end}"
+        counts = {}
+        for listing in listings:
+            cursor_file = f"{self.path}.{listing}.cursor"
+            started = time.perf_counter()
+            stored = 0
+            batch = []
+            for record in api.iter_papers(year_range, cursor_file=cursor_file, listing=listing):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    stored += self.store(listing, batch)
+                    batch = []
+            stored += self.store(listing, batch)
+
+            previous = self.synced_to(listing)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sync_state (listing, synced_to, synced_at) VALUES (?, ?, ?)",
+                    (listing, max(end, previous or end), time.time()),
+                )
+                if listing == "pubs":
+                    # Fresh pubs rows supersede the API misses remembered so far.
+                    self._db.execute("DELETE FROM pubs_misses")
+            if os.path.exists(cursor_file):
+                os.remove(cursor_file)
+            counts[listing] = stored
+            logging.info(f"[biorxiv_mirror] {listing} {year_range}: {stored} records "
+                         f"in {time.perf_counter() - started:.1f}s")
+        return counts
+
+    def refresh(self, default_start: str = "2013-11-01", end: Optional[str] = None,
+                listings: Iterable[str] = LISTINGS) -> dict:
+        """Sync each of *listings* from a day before its last synced date (or *default_start*)."""
+        counts = {}
+        for listing in listings:
+            synced_to = self.synced_to(listing)
+            if synced_to:
+                start = (datetime.date.fromisoformat(synced_to) - datetime.timedelta(days=1)).isoformat()
+            else:
+                start = default_start
+            counts.update(self.sync(start, end, listings=(listing,)))
+        return counts
+
+    def titles(self) -> Iterator[Tuple[str, str]]:
+        """``(doi, title)`` of the latest version of every mirrored preprint."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT doi, json_extract(record, '$.title'), MAX(version) FROM details GROUP BY doi"
+            ).fetchall()
+        for doi, title, _ in rows:
+            if title:
+                yield doi, title
+
+    def signature(self) -> Optional[Tuple[str, float]]:
+        """
+        Changes whenever a sync of the details listing completes.  Records
+        written back by :meth:`store` between syncs leave it unchanged.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT synced_to, synced_at FROM sync_state WHERE listing = 'details'"
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            details = self._db.execute("SELECT COUNT(DISTINCT doi) FROM details").fetchone()[0]
+            pubs = self._db.execute("SELECT COUNT(*) FROM pubs").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "preprints": details,
+            "published_pairs": pubs,
+            "synced_to": {listing: self.synced_to(listing) for listing in LISTINGS},
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+biorxiv_mirror = BiorxivMirror(
+    os.getenv("biorxiv_mirror_path", os.path.join(cache_root, "biorxiv_mirror.sqlite3"))
+)
@@ -0,0 +1,179 @@
+"""
+browser_pool.py
+===============
+
+Bounded pool of Playwright ``BrowserContext`` objects for the PDFResolver.
+
+A context is handed out per *domain* and goes back to that domain's idle
+list afterwards, so cookies and proxy/login state picked up on a publisher
+are reused by the next request to it.  A context is closed instead of being
+returned once it has served ``browser_context_max_uses`` requests (env,
+default 50) or when the browser processes use more than
+``browser_max_rss_mb`` (env, default 2048; needs ``psutil``).  At most
+``browser_max_contexts`` (env, default 4) are open at once; when the pool is
+full an idle context of another domain is closed to make room, otherwise
+the caller waits.
+
+```python
+pool = BrowserContextPool(new_context)        # async (domain) -> BrowserContext
+async with pool.acquire("nature.com") as context:
+    resp = await context.request.get(url)
+...
+await pool.close()
+```
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from playwright.async_api import BrowserContext
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class PooledContext:
+    def __init__(self, context: BrowserContext, domain: str):
+        self.context = context
+        self.domain = domain
+        self.uses = 0
+
+
+def browser_rss_mb() -> Optional[float]:
+    """Resident memory of this process's children (the Playwright driver and Chromium)."""
+    if psutil is None:
+        return None
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / 2**20
+
+
+class BrowserContextPool:
+    def __init__(
+        self,
+        new_context: Callable[[str], Awaitable[BrowserContext]],
+        max_contexts: Optional[int] = None,
+        max_uses: Optional[int] = None,
+        max_rss_mb: Optional[float] = None,
+    ):
+        self.new_context = new_context
+        self.max_contexts = max_contexts or int(os.getenv("browser_max_contexts", 4))
+        self.max_uses = max_uses or int(os.getenv("browser_context_max_uses", 50))
+        self.max_rss_mb = max_rss_mb or float(os.getenv("browser_max_rss_mb", 2048))
+        if psutil is None:
+            logging.warning("psutil not installed; browser contexts are recycled by use count only")
+
+        self._idle: Dict[str, List[PooledContext]] = {}
+        self._open = 0
+        self._cond = asyncio.Condition()
+        self._closed = False
+
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.evicted = 0
+
+    async def _take(self, domain: str) -> PooledContext:
+        victim = None
+        async with self._cond:
+            while True:
+                idle = self._idle.get(domain)
+                if idle:
+                    self.reused += 1
+                    return idle.pop()
+                if self._open < self.max_contexts:
+                    self._open += 1
+                    break
+                victim = self._pop_idle_other()
+                if victim is not None:
+                    # Same slot, different domain.
+                    self.evicted += 1
+                    break
+                await self._cond.wait()
+        try:
+            # Closing a context can be slow; other callers need not wait on the lock for it.
+            if victim is not None:
+                await self._close(victim)
+            context = await self.new_context(domain)
+        except BaseException:
+            async with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self.created += 1
+        return PooledContext(context, domain)
+
+    def _pop_idle_other(self) -> Optional[PooledContext]:
+        for domain, idle in self._idle.items():
+            if idle:
+                victim = idle.pop(0)
+                if not idle:
+                    del self._idle[domain]
+                return victim
+        return None
+
+    async def _close(self, pooled: PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception as exc:
+            logging.warning(f"Closing browser context for {pooled.domain} failed: {exc}")
+
+    def _worn_out(self, pooled: PooledContext) -> bool:
+        if pooled.uses >= self.max_uses:
+            return True
+        rss = browser_rss_mb()
+        return rss is not None and rss > self.max_rss_mb
+
+    @asynccontextmanager
+    async def acquire(self, domain: str) -> AsyncIterator[BrowserContext]:
+        pooled = await self._take(domain)
+        broken = False
+        try:
+            yield pooled.context
+        except BaseException:
+            # A context whose page crashed or timed out is not worth keeping.
+            broken = True
+            raise
+        finally:
+            pooled.uses += 1
+            if broken or self._closed or self._worn_out(pooled):
+                self.recycled += 1
+                await self._close(pooled)
+                async with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+            else:
+                async with self._cond:
+                    self._idle.setdefault(domain, []).append(pooled)
+                    self._cond.notify()
+
+    async def close(self):
+        """Close every idle context.  Contexts still in use are closed when released."""
+        async with self._cond:
+            self._closed = True
+            idle = [pooled for pooled_list in self._idle.values() for pooled in pooled_list]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            await self._close(pooled)
+
+    def stats(self) -> dict:
+        return {
+            "open": self._open,
+            "idle": sum(len(v) for v in self._idle.values()),
+            "created": self.created,
+            "reused": self.reused,
+            "recycled": self.recycled,
+            "evicted": self.evicted,
+            "rss_mb": browser_rss_mb(),
+        }
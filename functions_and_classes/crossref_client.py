@@ -0,0 +1,191 @@
+"""
+crossref_client.py
+==================
+
+Async counterparts of the Crossref lookups in paper_to_doi.py, for code that
+runs inside the event loop (the s3 pipeline, the PDFResolver).
+
+All calls share one pooled ``httpx.AsyncClient`` (built by http_client.py,
+so the per‑host limiter applies) and identify themselves with the
+``crossref_mailto`` address to get into Crossref's polite pool.
+
+```python
+info = await crossref.article_info_from_title(title)        # same shape as get_article_info_from_title
+infos = await crossref.article_info_from_titles(titles)     # batched, order preserved
+link = await crossref.document_link_for_doi(doi)
+```
+
+``crossref_timeout`` (env, default 15 s) bounds each request and
+``crossref_batch_concurrency`` (default 8) the lookups a batch runs at once.
+Answers are read through metadata_cache.py.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Iterable, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from functions_and_classes.http_client import build_async_client
+from functions_and_classes.metadata_cache import (
+    MISSING,
+    metadata_cache,
+    normalise_doi,
+    normalise_title,
+    remember,
+)
+
+load_dotenv()
+
+CROSSREF_API = "https://api.crossref.org"
+
+
+def pick_document_link(links: List[dict]) -> Optional[str]:
+    """text/html first, then application/pdf, then any ``.pdf`` URL."""
+    document_link = None
+    for link in links:
+        content_type = link.get("content-type")
+        url_link = link.get("URL")
+        if content_type == "text/html":
+            return url_link
+        elif content_type == "application/pdf" and document_link is None:
+            document_link = url_link
+        elif url_link and url_link.endswith(".pdf") and document_link is None:
+            document_link = url_link
+    return document_link
+
+
+def work_summary(message: dict) -> dict:
+    """The parts of a Crossref work we use; full records carry reference lists."""
+    return {
+        "title": message.get("title"),
+        "link": message.get("link") or [],
+        "license": message.get("license"),
+    }
+
+
+def item_summary(item: dict) -> dict:
+    return {"DOI": item.get("DOI"), "link": item.get("link") or []}
+
+
+class CrossrefClient:
+    def __init__(self, mailto: Optional[str] = None, timeout: Optional[float] = None):
+        self.mailto = mailto or os.getenv("crossref_mailto")
+        self.timeout = timeout or float(os.getenv("crossref_timeout", 15))
+        self.batch_concurrency = int(os.getenv("crossref_batch_concurrency", 8))
+        self._client: Optional[httpx.AsyncClient] = None
+        if not self.mailto:
+            logging.warning("crossref_mailto not set; Crossref requests go to the public pool")
+
+    def _client_required(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            agent = "biopapersnlp/1.0"
+            if self.mailto:
+                agent += f" (mailto:{self.mailto})"
+            self._client = build_async_client(
+                {"User-Agent": agent, "Accept": "application/json"},
+                timeout=httpx.Timeout(self.timeout),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_message(self, path: str, params: Optional[dict] = None):
+        """The response ``message``; ``None`` for a definite miss, :data:`MISSING` on errors."""
+        try:
+            response = await self._client_required().get(f"{CROSSREF_API}{path}", params=params)
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as exc:
+            logging.warning(f"[crossref] {path} failed: {exc}")
+            return MISSING
+        if data.get("status") != "ok":
+            return MISSING
+        return data.get("message")
+
+    async def work_by_doi(self, doi: str) -> Optional[dict]:
+        """Trimmed work (see :func:`work_summary`) for *doi*, or None."""
+        key = normalise_doi(doi)
+        work = metadata_cache.lookup("crossref_work", key)
+        if work is MISSING:
+            message = await self._get_message(f"/works/{doi}")
+            if message is MISSING:
+                return None
+            work = work_summary(message) if message else None
+            remember("crossref_work", key, work)
+        return work
+
+    async def search_title(self, title: str) -> Optional[dict]:
+        """Best Crossref match (``{"DOI", "link"}``) for a bibliographic *title*, or None."""
+        key = normalise_title(title)
+        if not key:
+            return None
+        item = metadata_cache.lookup("crossref_title", key)
+        if item is MISSING:
+            message = await self._get_message("/works", {"query.bibliographic": title, "rows": 1})
+            if message is MISSING:
+                return None
+            items = (message or {}).get("items", [])
+            item = item_summary(items[0]) if items else None
+            remember("crossref_title", key, item)
+        return item
+
+    async def article_info_from_title(self, title: str) -> Optional[dict]:
+        item = await self.search_title(title)
+        if item is None:
+            return None
+        return {
+            "title": title,
+            "doi": item.get("DOI"),
+            "document_link": pick_document_link(item.get("link", [])),
+        }
+
+    async def info_from_doi(self, doi: str, returnTitle: bool = True, addLicense: bool = False) -> Optional[dict]:
+        message = await self.work_by_doi(doi)
+        if message is None:
+            return None
+
+        result = {"doi": doi}
+        if returnTitle:
+            title = message.get("title", [None])
+            result["title"] = title[0] if title else None
+        document_link = pick_document_link(message.get("link", []))
+        if document_link:
+            result["document_link"] = document_link
+            if addLicense and message.get("license"):
+                result["license"] = message["license"]
+
+        if returnTitle:
+            return result
+        if "document_link" not in result:
+            return None
+        return {k: v for k, v in result.items() if k in ("document_link", "license")}
+
+    async def document_link_for_doi(self, doi: str) -> Optional[str]:
+        message = await self.work_by_doi(doi)
+        return pick_document_link(message.get("link", [])) if message else None
+
+    async def _batch(self, fn, args: Iterable[str]) -> List[Optional[dict]]:
+        slots = asyncio.Semaphore(self.batch_concurrency)
+
+        async def one(arg):
+            async with slots:
+                return await fn(arg)
+
+        return list(await asyncio.gather(*(one(arg) for arg in args)))
+
+    async def article_info_from_titles(self, titles: Iterable[str]) -> List[Optional[dict]]:
+        return await self._batch(self.article_info_from_title, titles)
+
+    async def info_from_dois(self, dois: Iterable[str]) -> List[Optional[dict]]:
+        return await self._batch(self.info_from_doi, dois)
+
+
+crossref = CrossrefClient()
@@ -1,8 +1,4 @@
-from pdf2image import convert_from_bytes
-import pytesseract
-import pdfplumber
 from urllib.parse import urljoin, urlparse, urlunparse, parse_qs, urlencode
-import io
 from playwright.async_api import async_playwright , Error as PlaywrightError
 import random
 import os
@@ -12,6 +8,10 @@ import logging
 from tenacity import retry, stop_after_attempt, wait_exponential , retry_if_exception_type
 from typing import Optional, List
 from transformers import PreTrainedTokenizerFast
+from functions_and_classes.pdf_cache import pdf_cache
+from functions_and_classes.pdf_parse_pool import parse_pool
+from functions_and_classes.http_client import build_async_client
+from functions_and_classes.rate_limit import host_limiter, limited_api_get
 
 
 load_dotenv()
@@ -36,6 +36,23 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/125.0",
 ]
 
+# One pooled client for the helpers below; headers and timeouts are set per request.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def shared_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = build_async_client()
+    return _http_client
+
+
+async def close_shared_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 tokenizer = PreTrainedTokenizerFast.from_pretrained(
     "/home/longlab/tabbyAPI/models/Llama-3-8B-Instruct-exl2",
     local_files_only=True
@@ -49,37 +66,6 @@ def chunk_text_by_char_limit_tokens(text, chunk_size = 8000):
 def chunk_text_by_char_limit(text, limit):
     return [text[i:i+limit] for i in range(0, len(text), limit)]
 
-
-def extract_text_with_ocr(pdf_bytes):
-    images = convert_from_bytes(pdf_bytes)
-    full_text = []
-    for i, img in enumerate(images):
-        text = pytesseract.image_to_string(img)
-        if text:
-            full_text.append(text)
-    return "\n".join(full_text).strip() if full_text else None
-
-
-def extract_pdf(pdf_data): 
-     
-    extracted_text = []
-
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
-                for pdf_page in pdf.pages:
-                    page_text = pdf_page.extract_text()
-                    if page_text:
-                        extracted_text.append(page_text)
-    except Exception as e:
-        print(f"pdfplumber failed: {e}")
-
-    if not extracted_text:
-        print("Falling back to OCR...")
-        ocr_text = extract_text_with_ocr(pdf_data)
-        return ocr_text
-
-    return "\n".join(extracted_text).strip() if extracted_text else None
-
 @retry(wait=wait_exponential(multiplier=1, min=2, max=30), stop=stop_after_attempt(4))
 async def extract_text_from_pdf_via_browser(landing_url: str):
     try:
@@ -122,28 +108,29 @@ async def extract_text_from_pdf_via_browser(landing_url: str):
                 logging.warning("playwright_stealth not installed; continuing without stealth")
 
             print(f"Navigating to EZProxy URL: {proxied_url}")
-            await page.goto(proxied_url, wait_until="networkidle" , timeout=50000)
+            async with host_limiter.limit_async(proxied_url):
+                await page.goto(proxied_url, wait_until="networkidle" , timeout=50000)
             await page.wait_for_timeout(50000)
 
             current_url = page.url
             if current_url.lower().endswith(".pdf") or "pdf" in current_url.lower():
                 print(f"Already on a PDF page: {current_url}")
-                response = await context.request.get(current_url)
+                response = await limited_api_get(context, current_url)
                 if response.status == 200 and "pdf" in response.headers.get("content-type", "").lower():
                     print("PDF detected via URL.")
                     content = await response.body()
-                    text = extract_pdf(content)
+                    text = await parse_pool.extract_pdf(content)
                     if text: return text
 
             try:
                 pdf_href = await page.get_by_role("link", name="PDF").get_attribute("href")
                 if pdf_href:
                     resolved_link = urljoin(page.url, pdf_href)
-                    response = await context.request.get(resolved_link)
+                    response = await limited_api_get(context, resolved_link)
                     if response.status == 200 and "pdf" in response.headers.get("content-type", "").lower():
                         print("PDF extracted from PDF button.")
                         content = await response.body()
-                        text = extract_pdf(content)
+                        text = await parse_pool.extract_pdf(content)
                         if text: return text
             except:
                 pass
@@ -157,10 +144,10 @@ async def extract_text_from_pdf_via_browser(landing_url: str):
                     if href and "pdf" in href:
                         pdf_link = urljoin(page.url, href)
                         print(f"📄 PDF found under nested class structure: {pdf_link}")
-                        response = await context.request.get(pdf_link)
+                        response = await limited_api_get(context, pdf_link)
                         if response.status == 200 and "pdf" in response.headers.get("content-type", "").lower():
                             content = await response.body()
-                            text = extract_pdf(content)
+                            text = await parse_pool.extract_pdf(content)
                             if text: return text
             except Exception as e:
                 print(f"Failed extracting nested class-based PDF link: {e}")
@@ -185,18 +172,18 @@ async def extract_text_from_pdf_via_browser(landing_url: str):
                             "Referer": landing_url
                         }
 
+                        client = shared_client()
                         for variant in pdf_variants:
                             reconstructed = f"{parsed.scheme}://{parsed.netloc}{prefix}/{variant}/{suffix}?download=False"
                             print(f"Trying reconstructed URL: {reconstructed}")
-                            async with httpx.AsyncClient(follow_redirects=True) as client:
-                                resp = await client.get(reconstructed, headers=headers)
-                                print(f"ℹ️ Status: {resp.status_code}, Content-Type: {resp.headers.get('Content-Type')}")
-                                if resp.status_code == 200:
-                                    content_type = resp.headers.get("Content-Type", "").lower()
-                                    if "pdf" in content_type:
-                                        print("✅ PDF detected via reconstructed URL.")
-                                        text = extract_pdf(resp.content)
-                                        if text: return text
+                            resp = await client.get(reconstructed, headers=headers, timeout=httpx.Timeout(5.0))
+                            print(f"ℹ️ Status: {resp.status_code}, Content-Type: {resp.headers.get('Content-Type')}")
+                            if resp.status_code == 200:
+                                content_type = resp.headers.get("Content-Type", "").lower()
+                                if "pdf" in content_type:
+                                    print("✅ PDF detected via reconstructed URL.")
+                                    text = await parse_pool.extract_pdf(resp.content)
+                                    if text: return text
                 except Exception as e:
                     print(f"Error during fallback reconstruction: {e}")
 
@@ -209,11 +196,10 @@ async def extract_text_from_pdf_via_browser(landing_url: str):
             "User-Agent": random_ua
         }
 
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
-            response = await client.get(landing_url, headers=headers)
-            if response.status_code == 200 and "pdf" in response.headers.get("content-type", "").lower():
-                print("PDF fetched directly from landing URL.")
-                return extract_pdf(response.content)
+        response = await shared_client().get(landing_url, headers=headers, timeout=30.0)
+        if response.status_code == 200 and "pdf" in response.headers.get("content-type", "").lower():
+            print("PDF fetched directly from landing URL.")
+            return await parse_pool.extract_pdf(response.content)
 
         logging.warning(f"All extraction methods failed for {landing_url}.")
         return None
@@ -264,20 +250,25 @@ async def get_biorxiv_pdf_link(article_url: str) -> Optional[str]:
 ]
     pdf_url = article_url if article_url.endswith(".full.pdf") else f"{article_url}.full.pdf"
 
+    cached = pdf_cache.get(pdf_url.strip())
+    if cached is not None:
+        return await parse_pool.extract_pdf(cached)
+
     last_exc: Optional[Exception] = None
+    client = shared_client()
 
     for hdr in _HEADERS_SETS:
         try:
-            async with httpx.AsyncClient(headers=hdr, timeout=60, follow_redirects=True) as client:
-                resp = await client.get(pdf_url.strip())
-                resp.raise_for_status()
+            resp = await client.get(pdf_url.strip(), headers=hdr, timeout=60)
+            resp.raise_for_status()
 
-                if resp.headers.get("Content-Type", "").lower().startswith("application/pdf"):
-                    return extract_pdf(resp.content)  # type: ignore[name-defined]
+            if resp.headers.get("Content-Type", "").lower().startswith("application/pdf"):
+                pdf_cache.put(pdf_url.strip(), resp.content)
+                return await parse_pool.extract_pdf(resp.content)
 
-                # Not a PDF – break early, no need to try other headers
-                print("⚠️  Not a PDF response (content‑type:", resp.headers.get("Content-Type"), ")")
-                return None
+            # Not a PDF – break early, no need to try other headers
+            print("⚠️  Not a PDF response (content‑type:", resp.headers.get("Content-Type"), ")")
+            return None
 
         except httpx.HTTPStatusError as exc:
             # 403 / 429 etc – remember and try next header bundle
@@ -0,0 +1,109 @@
+"""
+http_client.py
+==============
+
+One tuned ``httpx.AsyncClient`` factory for the resolver and friends, plus
+connection‑reuse metrics taken from httpcore's ``trace`` extension.
+
+```python
+client = build_async_client(headers)
+await client.get(url)
+print(connection_stats.snapshot())
+# {"requests": 120, "new_connections": 9, "tls_handshakes": 9,
+#  "reuse_rate": 0.925, "http2_requests": 97, "by_host": {...}}
+```
+
+Pool limits come from ``http_max_connections`` (default 100),
+``http_max_keepalive`` (default 20) and ``http_keepalive_expiry`` seconds
+(default 60).  HTTP/2 is used when the ``h2`` package is installed.  Every
+request goes through the per‑host limiter in rate_limit.py.
+"""
+
+import logging
+import os
+from collections import defaultdict
+from typing import Optional
+
+import httpx
+
+from functions_and_classes.rate_limit import RateLimitedTransport
+
+try:
+    import h2  # noqa: F401  (httpx only needs it importable)
+    http2_available = True
+except ImportError:
+    http2_available = False
+
+_h2_warned = False
+
+DEFAULT_TIMEOUT = httpx.Timeout(15.0, read=30.0)
+
+
+class ConnectionStats:
+    """Counts requests vs. new TCP connections / TLS handshakes, per host."""
+
+    def __init__(self):
+        self.by_host = defaultdict(lambda: defaultdict(int))
+
+    def tracer(self, host: str):
+        counters = self.by_host[host]
+
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                counters["new_connections"] += 1
+            elif event_name == "connection.start_tls.complete":
+                counters["tls_handshakes"] += 1
+            elif event_name == "http11.send_request_headers.started":
+                counters["requests"] += 1
+            elif event_name == "http2.send_request_headers.started":
+                counters["requests"] += 1
+                counters["http2_requests"] += 1
+
+        return trace
+
+    async def on_request(self, request: httpx.Request):
+        # Event hook: attach a tracer to every request the client sends.
+        request.extensions["trace"] = self.tracer(request.url.host)
+
+    def snapshot(self) -> dict:
+        totals = defaultdict(int)
+        for counters in self.by_host.values():
+            for name, value in counters.items():
+                totals[name] += value
+        requests = totals["requests"]
+        return {
+            "requests": requests,
+            "new_connections": totals["new_connections"],
+            "tls_handshakes": totals["tls_handshakes"],
+            "reuse_rate": 1 - totals["new_connections"] / requests if requests else 0.0,
+            "http2_requests": totals["http2_requests"],
+            "by_host": {host: dict(counters) for host, counters in self.by_host.items()},
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+def build_async_client(headers: Optional[dict] = None, **overrides) -> httpx.AsyncClient:
+    global _h2_warned
+    if not http2_available and not _h2_warned:
+        _h2_warned = True
+        logging.warning("h2 not installed; httpx clients fall back to HTTP/1.1")
+    # Pool limits and HTTP/2 belong to the transport once one is passed in.
+    transport = RateLimitedTransport(
+        http2=http2_available,
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("http_max_connections", 100)),
+            max_keepalive_connections=int(os.getenv("http_max_keepalive", 20)),
+            keepalive_expiry=float(os.getenv("http_keepalive_expiry", 60)),
+        ),
+    )
+    options = dict(
+        headers=headers,
+        follow_redirects=True,
+        timeout=DEFAULT_TIMEOUT,
+        transport=transport,
+        event_hooks={"request": [connection_stats.on_request]},
+    )
+    options.update(overrides)
+    return httpx.AsyncClient(**options)
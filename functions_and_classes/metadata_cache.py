@@ -0,0 +1,58 @@
+"""
+metadata_cache.py
+=================
+
+Shared SQLite cache for Crossref and OpenCitations answers, read through by
+both the sync lookups in paper_to_doi.py and the async CrossrefClient.
+
+Namespaces:
+
+* ``crossref_title`` – normalised title → best Crossref item (DOI + links)
+* ``crossref_work``  – normalised DOI → trimmed work (title, links, license)
+* ``oc_doi`` / ``oc_omid`` – first OpenCitations Meta record (id, doi) by DOI / OMID
+
+A definite miss (404, no items) is stored as ``None`` for
+``metadata_negative_ttl_hours`` (env, default 24); answers are kept for
+``metadata_ttl_days`` (default 30).  Network errors are never cached.
+
+```python
+key = normalise_doi(doi)
+work = metadata_cache.lookup("crossref_work", key)
+if work is MISSING:
+    work = fetch(...)
+    remember("crossref_work", key, work)
+```
+
+``metadata_cache.stats()`` gives hits / misses / hit_rate per namespace.
+"""
+
+import os
+import re
+from typing import Any, Optional
+
+from functions_and_classes.pdf_cache import cache_root
+from functions_and_classes.ttl_cache import MISSING, SQLiteTTLCache  # noqa: F401  (MISSING re-exported for callers)
+
+METADATA_TTL = float(os.getenv("metadata_ttl_days", 30)) * 86400
+METADATA_NEGATIVE_TTL = float(os.getenv("metadata_negative_ttl_hours", 24)) * 3600
+
+metadata_cache = SQLiteTTLCache(os.path.join(cache_root, "metadata.sqlite3"))
+
+_DOI_PREFIX_RE = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:)", re.I)
+
+
+def normalise_doi(doi: str) -> str:
+    return _DOI_PREFIX_RE.sub("", doi.strip()).lower()
+
+
+def normalise_title(title: Optional[str]) -> str:
+    """Cache key for *title*; "" for a missing title, which callers must not look up."""
+    if not title:
+        return ""
+    return re.sub(r"\s+", " ", title).strip().casefold()
+
+
+def remember(namespace: str, key: str, value: Any):
+    """Cache *value*; ``None`` is a negative entry with the shorter TTL."""
+    ttl = METADATA_NEGATIVE_TTL if value is None else METADATA_TTL
+    metadata_cache.put(namespace, key, value, ttl=ttl)
@@ -0,0 +1,83 @@
+"""
+paper_state.py
+==============
+
+Per‑paper checkpoints for the s3 extraction pipeline.  Each stage saves what
+it produced (raw pages, cleaned preprint, DOIs, bioRxiv metadata, published
+raw text, ...) under the preprint's file name, and skips its work when the
+value is already there.  A retry therefore only pays for the stages whose
+results were dropped.
+
+```python
+paper_state = PaperStateStore(os.path.join(repo_root, "papers", "paper_state.sqlite3"))
+state = paper_state.load("paper.pdf")          # {"pages": [...], "title": "...", ...}
+paper_state.save("paper.pdf", published_raw=text)
+paper_state.drop("paper.pdf", ["published_raw", "url"])
+```
+
+Values are JSON, stored one row per ``(pdf_name, key)`` so saving a single
+stage never rewrites the large ones.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable
+
+
+class PaperStateStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS paper_state ("
+            " pdf_name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " updated_at REAL NOT NULL, PRIMARY KEY (pdf_name, key))"
+        )
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def load(self, pdf_name: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM paper_state WHERE pdf_name = ?", (pdf_name,)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, pdf_name: str, **values: Any):
+        now = time.time()
+        rows = [(pdf_name, key, json.dumps(value), now) for key, value in values.items()]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO paper_state (pdf_name, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._db.execute("COMMIT")
+
+    def drop(self, pdf_name: str, keys: Iterable[str]):
+        keys = list(keys)
+        if not keys:
+            return
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM paper_state WHERE pdf_name = ? AND key IN ({','.join('?' * len(keys))})",
+                (pdf_name, *keys),
+            )
+
+    def forget(self, pdf_name: str):
+        with self._lock:
+            self._db.execute("DELETE FROM paper_state WHERE pdf_name = ?", (pdf_name,))
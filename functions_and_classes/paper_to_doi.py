@@ -1,7 +1,8 @@
 from docling.document_converter import DocumentConverter
-import requests, re, time, os
-
-CROSSREF_API_WAIT = 1/50 +0.05
+import requests, re, os
+from functions_and_classes.rate_limit import limited_get, limited_post
+from functions_and_classes.crossref_client import item_summary, pick_document_link, work_summary
+from functions_and_classes.metadata_cache import MISSING, metadata_cache, normalise_doi, normalise_title, remember
 
 def get_article_info_from_title(title):
     """
@@ -12,53 +13,41 @@ def get_article_info_from_title(title):
     :param title: A string representing the title of the research paper.
     :return: A dictionary containing the title, DOI, and document_link, or None if no document link is found.
     """
-    url = f"https://api.crossref.org/works?query.bibliographic={title}&rows=1"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get("status") == "ok":
-            items = data.get("message", {}).get("items", [])
-            if items:
-                # Get the first item
-                item = items[0]
-                doi = item.get("DOI")
-
-                # Get all links from the item
-                links = item.get("link", [])
-
-                document_link = None
-
-                # Iterate through links once to find the best document link
-                for link in links:
-                    content_type = link.get("content-type")
-                    url_link = link.get("URL")
-
-                    # Prioritize text/html
-                    if content_type == "text/html":
-                        document_link = url_link
-                        break
-                    # Fallback to application/pdf
-                    elif content_type == "application/pdf" and document_link is None:
-                        document_link = url_link
-                    # Fallback to any .pdf URL
-                    elif url_link and url_link.endswith(".pdf") and document_link is None:
-                        document_link = url_link
-
-                # Construct the result
-                result = {"title": title, "doi": doi}
-
-                if document_link:
-                    result["document_link"] = document_link
-                else: result["document_link"] = None
-
-                return result
-
-    except requests.exceptions.RequestException:
+    key = normalise_title(title)
+    if not key:
+        return None
+    item = metadata_cache.lookup("crossref_title", key)
+    if item is MISSING:
+        url = f"https://api.crossref.org/works?query.bibliographic={title}&rows=1"
+        try:
+            response = limited_get(url, timeout=15)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException:
+            return None
+
+        if data.get("status") != "ok":
+            return None
+        items = data.get("message", {}).get("items", [])
+        # Get the first item; an empty result is cached as a miss
+        item = item_summary(items[0]) if items else None
+        remember("crossref_title", key, item)
+
+    if item is None:
         return None
+    doi = item.get("DOI")
+
+    # text/html, then application/pdf, then any .pdf URL
+    document_link = pick_document_link(item.get("link", []))
+
+    # Construct the result
+    result = {"title": title, "doi": doi}
+
+    if document_link:
+        result["document_link"] = document_link
+    else: result["document_link"] = None
 
-    return None
+    return result
 
 def get_info_from_doi(doi, returnTitle=True, addLicense=False):
     """
@@ -72,60 +61,56 @@ def get_info_from_doi(doi, returnTitle=True, addLicense=False):
     Returns:
         dict or None: A dictionary containing the requested information or None if no document link is found and returnTitle is False.
     """
-    url = f"https://api.crossref.org/works/{doi}"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-
-        result = {"doi": doi}
-
-        # Title retrieval
-        if returnTitle:
-            title = data.get('message', {}).get('title', [None])
-            result['title'] = title[0] if title else None
-
-        # Document link selection
-        document_link = None
-        links = data.get('message', {}).get('link', [])
-
-        for link in links:
-            content_type = link.get('content-type')
-            url_link = link.get('URL')
-
-            if content_type == 'text/html':
-                document_link = url_link
-                break
-            elif content_type == 'application/pdf' and document_link is None:
-                document_link = url_link
-            elif url_link and url_link.endswith('.pdf') and document_link is None:
-                document_link = url_link
-
-        # Add document link if found
-        if document_link:
-            result['document_link'] = document_link
-
-            # Add license if requested
-            if addLicense:
-                license_info = data.get('message', {}).get('license')
-                if license_info:
-                    result['license'] = license_info
-
-        # Determine final return value
-        if returnTitle:
-            return result
-        else:
-            if 'document_link' in result:
-                new_result = {'document_link': result['document_link']}
-                if addLicense and 'license' in result:
-                    new_result['license'] = result['license']
-                return new_result
+    key = normalise_doi(doi)
+    work = metadata_cache.lookup("crossref_work", key)
+    if work is MISSING:
+        url = f"https://api.crossref.org/works/{doi}"
+        try:
+            response = limited_get(url, timeout=15)
+            if response.status_code == 404:
+                work = None
             else:
-                return None
+                response.raise_for_status()
+                work = work_summary(response.json().get('message', {}))
+        except requests.exceptions.RequestException:
+            return None
+        remember("crossref_work", key, work)
 
-    except requests.exceptions.RequestException:
+    if work is None:
         return None
 
+    result = {"doi": doi}
+
+    # Title retrieval
+    if returnTitle:
+        title = work.get('title') or [None]
+        result['title'] = title[0] if title else None
+
+    # Document link selection
+    document_link = pick_document_link(work.get('link', []))
+
+    # Add document link if found
+    if document_link:
+        result['document_link'] = document_link
+
+        # Add license if requested
+        if addLicense:
+            license_info = work.get('license')
+            if license_info:
+                result['license'] = license_info
+
+    # Determine final return value
+    if returnTitle:
+        return result
+    else:
+        if 'document_link' in result:
+            new_result = {'document_link': result['document_link']}
+            if addLicense and 'license' in result:
+                new_result['license'] = result['license']
+            return new_result
+        else:
+            return None
+
 def parse_bibtex(file_path):
     """
     Parses a BibTeX file and returns a list of dictionaries, where each
@@ -175,6 +160,24 @@ def parse_bibtex(file_path):
 
     return final_tex_dicts
 
+def opencitations_metadata(scheme, identifier):
+    """
+    First OpenCitations Meta record for ``scheme:identifier`` (only its
+    ``id`` and ``doi`` fields), read through the metadata cache.  Returns
+    None when OpenCitations has no record; raises on request failures.
+    """
+    namespace = f"oc_{scheme}"
+    record = metadata_cache.lookup(namespace, identifier)
+    if record is MISSING:
+        url = f"https://opencitations.net/meta/api/v1/metadata/{scheme}:{identifier}"
+        response = limited_get(url, timeout=30)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch metadata: {response.status_code}")
+        metadata = response.json()
+        record = {"id": metadata[0].get("id", ""), "doi": metadata[0].get("doi", "")} if metadata else None
+        remember(namespace, identifier, record)
+    return record
+
 def get_omid_from_doi(doi):
     """
     Fetches the OpenCitations Metadata Identifier (OMID) for a given DOI.
@@ -188,16 +191,12 @@ def get_omid_from_doi(doi):
     Raises:
         Exception: If the request fails, no metadata is found, or the OMID is not found in the metadata.
     """
-    url = f"https://opencitations.net/meta/api/v1/metadata/doi:{doi}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch metadata: {response.status_code}")
-    metadata = response.json()
+    metadata = opencitations_metadata("doi", normalise_doi(doi))
 
     if not metadata:
         raise Exception("No metadata found for the given DOI")
 
-    id_field = metadata[0].get("id", "")
+    id_field = metadata.get("id", "")
 
     omid_match = re.search(r"omid:br/(\d+)", id_field)
     if not omid_match:
@@ -219,16 +218,12 @@ def get_doi_from_omid(omid):
     Raises:
         Exception: If the request fails, no metadata is found, or the DOI is not found in the metadata.
     """
-    url = f"https://opencitations.net/meta/api/v1/metadata/omid:{omid}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        raise Exception(f"Failed to fetch metadata: {response.status_code}")
-    metadata = response.json()
+    metadata = opencitations_metadata("omid", omid.strip())
 
     if not metadata:
         raise Exception("No metadata found for the given OMID")
 
-    doi_field = metadata[0].get("doi", "")
+    doi_field = metadata.get("doi", "")
     if not doi_field:
         raise Exception("DOI not found in the metadata")
 
@@ -263,7 +258,7 @@ def get_citing_entities(omid,
         "Content-Type": "application/sparql-query",
         "Accept": "application/sparql-results+json"
     }
-    response = requests.post(sparql_url, data=sparql_query.encode('utf-8'), headers=headers)
+    response = limited_post(sparql_url, data=sparql_query.encode('utf-8'), headers=headers)
 
     if response.status_code != 200:
         raise Exception(f"Failed to run SPARQL query: {response.status_code}")
@@ -326,7 +321,7 @@ def process_document_to_dict(docfile):
 
         refdois = []
         for ref in references:
-            time.sleep(CROSSREF_API_WAIT) # Crossref api grace period
+            # Crossref pacing is handled by the api.crossref.org limit in rate_limit.py
             refdois.append(get_article_info_from_title(ref))
         
         # Combine the paper body and the bibliography with DOIs
@@ -0,0 +1,206 @@
+"""
+pdf_backends.py
+===============
+
+Pluggable text‑layer extractors and the single :func:`extract_pdf` used by
+the resolver, the bioRxiv fetchers and the parse pool.
+
+Available backends:
+
+* ``pdfplumber`` – default; full layout analysis, slowest.
+* ``pdfminer``   – raw pdfminer text with layout analysis disabled.
+* ``pypdfium2``  – PDFium text pages, only when ``pypdfium2`` is installed.
+
+Pick one with the ``pdf_text_backend`` env variable or pass ``backend=`` to
+:func:`extract_pdf`.  ``Document_Extraction/benchmark_pdf_backends.py``
+compares them on a folder of PDFs.
+"""
+
+import io
+import logging
+import os
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Union
+
+import pdfplumber
+from pdfminer.converter import TextConverter
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+from functions_and_classes.pdf_cache import sha256_of
+from functions_and_classes.pdf_ocr import join_routed_pages, route_pages_to_ocr, summarise_routes
+from functions_and_classes.pdf_text_cache import text_cache
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+PDFSource = Union[bytes, str]
+
+default_backend = os.getenv("pdf_text_backend", "pdfplumber")
+
+
+def _open_source(source: PDFSource):
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+class TextBackend(ABC):
+    """
+    Turns a PDF (bytes or path) into one string per page.  ``start``/``stop``
+    select a 0‑based page range so large documents can be parsed in slices;
+    :meth:`iter_pages` reads the document in order from one open.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def extract_pages(self, source: PDFSource, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        ...
+
+    def iter_pages(self, source: PDFSource) -> Iterator[str]:
+        yield from self.extract_pages(source)
+
+    def page_count(self, source: PDFSource) -> int:
+        with _open_source(source) as fp:
+            document = PDFDocument(PDFParser(fp))
+            try:
+                return int(resolve1(document.catalog["Pages"])["Count"])
+            except Exception:
+                return sum(1 for _ in PDFPage.create_pages(document))
+
+
+class PdfplumberBackend(TextBackend):
+    name = "pdfplumber"
+
+    def extract_pages(self, source: PDFSource, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        pages = []
+        wanted = list(range(start + 1, stop + 1)) if stop is not None else None
+        with pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source, pages=wanted) as pdf:
+            for page in pdf.pages if wanted is not None else pdf.pages[start:]:
+                try:
+                    pages.append(page.extract_text() or "")
+                except Exception:
+                    pages.append("")
+        return pages
+
+    def iter_pages(self, source: PDFSource) -> Iterator[str]:
+        with pdfplumber.open(io.BytesIO(source) if isinstance(source, bytes) else source) as pdf:
+            for page in pdf.pages:
+                try:
+                    yield page.extract_text() or ""
+                except Exception:
+                    yield ""
+                finally:
+                    # Drop the parsed layout so a long document is not held in memory.
+                    page.close()
+
+
+class PdfminerRawBackend(TextBackend):
+    """pdfminer with ``laparams=None``: text in content‑stream order, no layout pass."""
+
+    name = "pdfminer"
+
+    def extract_pages(self, source: PDFSource, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        return list(islice(self.iter_pages(source), start, stop))
+
+    def iter_pages(self, source: PDFSource) -> Iterator[str]:
+        manager = PDFResourceManager(caching=True)
+        out = io.StringIO()
+        device = TextConverter(manager, out, laparams=None)
+        interpreter = PDFPageInterpreter(manager, device)
+        try:
+            with _open_source(source) as fp:
+                for page in PDFPage.get_pages(fp):
+                    out.seek(0)
+                    out.truncate()
+                    try:
+                        interpreter.process_page(page)
+                        text = out.getvalue()
+                    except Exception:
+                        text = ""
+                    yield text
+        finally:
+            device.close()
+
+
+class PypdfiumBackend(TextBackend):
+    name = "pypdfium2"
+
+    def extract_pages(self, source: PDFSource, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        return list(self._pages(source, start, stop))
+
+    def iter_pages(self, source: PDFSource) -> Iterator[str]:
+        return self._pages(source, 0, None)
+
+    def _pages(self, source: PDFSource, start: int, stop: Optional[int]) -> Iterator[str]:
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            for index in range(start, len(pdf) if stop is None else min(stop, len(pdf))):
+                page = pdf[index]
+                try:
+                    textpage = page.get_textpage()
+                    text = textpage.get_text_range() or ""
+                    textpage.close()
+                except Exception:
+                    text = ""
+                finally:
+                    page.close()
+                yield text
+        finally:
+            pdf.close()
+
+    def page_count(self, source: PDFSource) -> int:
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+BACKENDS: Dict[str, TextBackend] = {
+    backend.name: backend
+    for backend in (PdfplumberBackend(), PdfminerRawBackend())
+}
+if pypdfium2 is not None:
+    BACKENDS[PypdfiumBackend.name] = PypdfiumBackend()
+
+
+def get_backend(name: Optional[str] = None) -> TextBackend:
+    name = name or default_backend
+    backend = BACKENDS.get(name)
+    if backend is None:
+        logging.warning(f"PDF text backend {name!r} is not available; using pdfplumber")
+        backend = BACKENDS["pdfplumber"]
+    return backend
+
+
+def extract_pdf(pdf_data: bytes, with_summary: bool = False, backend: Optional[str] = None):
+    """
+    Text of *pdf_data*, using the backend's text layer where it is usable and
+    OCR for the pages where it is not.  With ``with_summary=True`` returns
+    ``(text, {"pages": n, "text": .., "ocr": .., "empty": ..})``.
+    """
+    text_backend = get_backend(backend)
+    pdf_hash = sha256_of(pdf_data)
+    extractor = f"extract_pdf:{text_backend.name}"
+    routed = text_cache.get(pdf_hash, extractor)
+
+    if routed is None:
+        try:
+            pages = text_backend.extract_pages(pdf_data)
+        except Exception as e:
+            print(f"{text_backend.name} failed: {e}")
+            pages = []
+
+        routed = route_pages_to_ocr(pdf_data, pages)
+        text_cache.put(pdf_hash, extractor, routed)
+
+    text = join_routed_pages(routed)
+    if with_summary:
+        return text, summarise_routes(routed)
+    return text
@@ -0,0 +1,178 @@
+"""
+pdf_cache.py
+============
+
+Content‑addressed on‑disk store for downloaded PDF bodies.
+
+Every PDF we fetch is written once under its sha256 and indexed by the URL it
+came from, so reruns of the extraction scripts can skip the publisher round
+trip entirely:
+
+```python
+raw = pdf_cache.get(url)
+if raw is None:
+    raw = await download(url)
+    pdf_cache.put(url, raw)
+```
+
+The store is capped at ``pdf_cache_max_bytes`` (env, default 20 GiB) and
+evicts least‑recently‑used blobs once the cap is exceeded.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+cache_root = os.getenv("cache_dir", os.path.join(os.path.dirname(__file__), "..", "cache"))
+
+
+def sha256_of(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_of_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def looks_like_pdf(data: bytes) -> bool:
+    """PDF files must carry the ``%PDF`` magic within the first 1024 bytes."""
+    return b"%PDF" in data[:1024]
+
+
+class PDFBlobCache:
+    """
+    Blobs live in ``<root>/<sha[:2]>/<sha>``; a small SQLite index maps
+    URL → sha256 and keeps the size and last access time used for LRU eviction.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or os.path.join(cache_root, "pdf_blobs")
+        if max_bytes is None:
+            max_bytes = int(os.getenv("pdf_cache_max_bytes", 20 * 1024 ** 3))
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+        self._connect()
+        # Parse workers are forked from the pipeline; each child needs its own
+        # SQLite handle and a lock nobody else can be holding.
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS blobs_lru ON blobs(last_access)")
+
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.root, "index.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha)
+
+    def _read_blob(self, sha: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(sha), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            # Index and disk disagree (blob removed by hand) – forget it.
+            self._db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+            self._db.execute("DELETE FROM urls WHERE sha256 = ?", (sha,))
+            return None
+        self._db.execute("UPDATE blobs SET last_access = ? WHERE sha256 = ?", (time.time(), sha))
+        return data
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Return the cached body for *url*, or *None* on a miss."""
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM urls WHERE url = ?", (url,)).fetchone()
+            data = self._read_blob(row[0]) if row else None
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return data
+
+    def get_by_hash(self, sha: str) -> Optional[bytes]:
+        with self._lock:
+            return self._read_blob(sha)
+
+    def put(self, url: str, data: bytes) -> Optional[str]:
+        """
+        Store *data* under its sha256 and point *url* at it.
+        Bodies that are not PDFs are ignored; returns the hash or *None*.
+        """
+        if not data or not looks_like_pdf(data):
+            return None
+        sha = sha256_of(data)
+        path = self._blob_path(sha)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO blobs (sha256, size, last_access) VALUES (?, ?, ?)",
+                (sha, len(data), time.time()),
+            )
+            self._db.execute("INSERT OR REPLACE INTO urls (url, sha256) VALUES (?, ?)", (url, sha))
+            self._evict()
+        return sha
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha, size in self._db.execute(
+            "SELECT sha256, size FROM blobs ORDER BY last_access ASC"
+        ).fetchall():
+            try:
+                os.remove(self._blob_path(sha))
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM blobs WHERE sha256 = ?", (sha,))
+            self._db.execute("DELETE FROM urls WHERE sha256 = ?", (sha,))
+            total -= size
+            logging.info(f"pdf cache evicted {sha} ({size} bytes)")
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            blobs, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "blobs": blobs,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+pdf_cache = PDFBlobCache()
@@ -0,0 +1,274 @@
+"""
+pdf_ocr.py
+==========
+
+Streaming, page‑parallel OCR for scanned PDFs.
+
+``convert_from_bytes(pdf)`` rasterises the whole document before Tesseract
+sees the first page, which costs gigabytes on long scans and uses one core.
+:func:`ocr_pdf_streaming` instead hands page numbers to a process pool; each
+worker renders a single page, OCRs it and drops the image.  At most
+``ocr_window`` pages (env, default twice the worker count) are in flight, so
+no more than that many page images are ever resident.
+
+```python
+pages, timings = ocr_pdf_streaming(pdf_bytes)
+# timings -> [{"page": 1, "render_s": 0.41, "ocr_s": 2.3, "chars": 3121}, ...]
+```
+
+:func:`route_pages_to_ocr` builds on it for mixed documents: pages whose
+text layer came back empty or garbled are OCR'd, every other page keeps its
+pdfplumber text.
+
+``ocr_workers`` (env, default ``os.cpu_count()``) sets the pool size and
+``ocr_dpi`` the render resolution.  Both ``ocr_workers`` and ``ocr_window``
+are machine‑wide budgets: inside a PDFParsePool worker (see
+:func:`configure_ocr_share`) each process gets its share of them, so
+concurrent parse workers together stay within the caps.
+
+``ocr_mode=batch`` switches :func:`ocr_pages`, and so the router, to the
+old whole‑document ``convert_from_bytes`` path (:func:`ocr_pdf_batch`).
+"""
+
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytesseract
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_path
+
+ocr_mode = os.getenv("ocr_mode", "stream")
+ocr_workers = int(os.getenv("ocr_workers", os.cpu_count() or 1))
+ocr_window = int(os.getenv("ocr_window", 2 * ocr_workers))
+ocr_dpi = int(os.getenv("ocr_dpi", 200))
+ocr_min_page_chars = int(os.getenv("ocr_min_page_chars", 20))
+
+# pdfminer writes glyphs it cannot map to unicode as "(cid:123)".
+_CID_RE = re.compile(r"\(cid:\d+\)")
+
+_executor: ProcessPoolExecutor | None = None
+_executor_pid: int | None = None
+
+# How many processes split the OCR budget; set in each parse pool worker.
+_ocr_share = 1
+
+
+def configure_ocr_share(processes: int):
+    """Process initializer for parse workers: take 1/*processes* of the OCR budget."""
+    global _ocr_share
+    _ocr_share = max(1, processes)
+
+
+def ocr_budget() -> Tuple[int, int]:
+    """``(workers, window)`` this process may use."""
+    return max(1, ocr_workers // _ocr_share), max(1, ocr_window // _ocr_share)
+
+
+def _executor_required() -> ProcessPoolExecutor:
+    # The OCR pool belongs to the process that created it; a forked parse
+    # worker must build its own, sized to its share.
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ProcessPoolExecutor(max_workers=ocr_budget()[0])
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def ocr_page(path: str, page_number: int, dpi: int) -> Tuple[int, str, Dict]:
+    """Render and OCR one 1‑based page of the PDF at *path*."""
+    start = time.perf_counter()
+    images = convert_from_path(path, dpi=dpi, first_page=page_number, last_page=page_number)
+    rendered = time.perf_counter()
+    text = pytesseract.image_to_string(images[0]) if images else ""
+    for img in images:
+        img.close()
+    done = time.perf_counter()
+    return page_number, text or "", {
+        "page": page_number,
+        "render_s": round(rendered - start, 3),
+        "ocr_s": round(done - rendered, 3),
+        "chars": len(text or ""),
+    }
+
+
+def _ocr_path(path: str, page_numbers: List[int], dpi: int) -> Tuple[Dict[int, str], List[Dict]]:
+    executor = _executor_required()
+    window = ocr_budget()[1]
+    texts: Dict[int, str] = {}
+    timings: List[Dict] = []
+    todo = iter(page_numbers)
+    in_flight = set()
+
+    while True:
+        while len(in_flight) < window:
+            page_number = next(todo, None)
+            if page_number is None:
+                break
+            in_flight.add(executor.submit(ocr_page, path, page_number, dpi))
+        if not in_flight:
+            break
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                page_number, text, timing = future.result()
+            except Exception as exc:
+                logging.warning(f"OCR failed on a page of {path}: {exc}")
+                continue
+            texts[page_number] = text
+            timings.append(timing)
+
+    timings.sort(key=lambda t: t["page"])
+    return texts, timings
+
+
+def ocr_pdf_streaming(
+    pdf_data: bytes,
+    page_numbers: Optional[Iterable[int]] = None,
+    dpi: Optional[int] = None,
+) -> Tuple[List[str], List[Dict]]:
+    """
+    OCR *pdf_data* page by page across the OCR pool.
+
+    Parameters
+    ----------
+    pdf_data : bytes
+        Raw PDF body.
+    page_numbers : Iterable[int] | None
+        1‑based pages to OCR; every page when omitted.
+    dpi : int | None
+        Render resolution, defaults to ``ocr_dpi``.
+
+    Returns
+    -------
+    tuple[list[str], list[dict]]
+        One text per requested page (in order, ``""`` when a page failed) and
+        the per‑page timings.
+    """
+    dpi = dpi or ocr_dpi
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_data)
+        if page_numbers is None:
+            page_numbers = range(1, pdfinfo_from_path(path)["Pages"] + 1)
+        page_numbers = list(page_numbers)
+
+        start = time.perf_counter()
+        texts, timings = _ocr_path(path, page_numbers, dpi)
+        elapsed = time.perf_counter() - start
+    finally:
+        os.remove(path)
+
+    logging.info(
+        f"OCR'd {len(timings)}/{len(page_numbers)} pages in {elapsed:.1f}s "
+        f"with {ocr_budget()[0]} workers; slowest page "
+        f"{max((t['render_s'] + t['ocr_s'] for t in timings), default=0):.1f}s"
+    )
+    return [texts.get(n, "") for n in page_numbers], timings
+
+
+def log_ocr_timings(timings: List[Dict]):
+    for t in timings:
+        logging.info(
+            f"OCR page {t['page']}: render {t['render_s']:.2f}s, ocr {t['ocr_s']:.2f}s, {t['chars']} chars"
+        )
+
+
+def ocr_pdf_batch(
+    pdf_data: bytes,
+    page_numbers: Optional[Iterable[int]] = None,
+    dpi: Optional[int] = None,
+) -> Tuple[List[str], List[Dict]]:
+    """
+    The old single‑process path: rasterise the whole document with
+    ``convert_from_bytes`` and OCR the requested pages in turn.  Same return
+    shape as :func:`ocr_pdf_streaming`; ``render_s`` is the document render
+    time spread evenly over its pages.
+    """
+    start = time.perf_counter()
+    images = convert_from_bytes(pdf_data, dpi=dpi or ocr_dpi)
+    render_s = (time.perf_counter() - start) / max(len(images), 1)
+    page_numbers = list(page_numbers) if page_numbers is not None else list(range(1, len(images) + 1))
+    texts, timings = [], []
+    try:
+        for page_number in page_numbers:
+            if page_number > len(images):
+                texts.append("")
+                continue
+            started = time.perf_counter()
+            text = pytesseract.image_to_string(images[page_number - 1]) or ""
+            texts.append(text)
+            timings.append({
+                "page": page_number,
+                "render_s": round(render_s, 3),
+                "ocr_s": round(time.perf_counter() - started, 3),
+                "chars": len(text),
+            })
+    finally:
+        for img in images:
+            img.close()
+    return texts, timings
+
+
+def ocr_pages(pdf_data: bytes, page_numbers: Optional[Iterable[int]] = None) -> List[str]:
+    """OCR *page_numbers* (every page when omitted) the way ``ocr_mode`` says, logging the timings."""
+    if ocr_mode == "batch":
+        texts, timings = ocr_pdf_batch(pdf_data, page_numbers)
+    else:
+        texts, timings = ocr_pdf_streaming(pdf_data, page_numbers)
+    log_ocr_timings(timings)
+    return texts
+
+
+def needs_ocr(page_text: str) -> bool:
+    """True when a page's text layer is missing or too garbled to keep."""
+    text = page_text.strip()
+    if len(text) < ocr_min_page_chars:
+        return True
+    cid_chars = sum(len(m) for m in _CID_RE.findall(text))
+    if cid_chars > 0.3 * len(text):
+        return True
+    readable = sum(ch.isalnum() or ch.isspace() for ch in text)
+    return readable < 0.5 * len(text)
+
+
+def route_pages_to_ocr(pdf_data: bytes, pages: List[str]) -> List[Tuple[str, str]]:
+    """
+    Return ``(source, text)`` per page, where *source* is ``"text"``,
+    ``"ocr"`` or ``"empty"``.  Only pages flagged by :func:`needs_ocr` are
+    OCR'd; if pdfplumber produced no pages at all the whole document is.
+    """
+    if not pages:
+        ocr_texts = ocr_pages(pdf_data)
+        return [("ocr", t) if t.strip() else ("empty", "") for t in ocr_texts]
+
+    routed = [("text", t) for t in pages]
+    targets = [n for n, t in enumerate(pages, 1) if needs_ocr(t)]
+    if not targets:
+        return routed
+
+    logging.info(f"Falling back to OCR on {len(targets)} of {len(pages)} pages")
+    ocr_texts = ocr_pages(pdf_data, targets)
+    for page_number, ocr_text in zip(targets, ocr_texts):
+        layer_text = pages[page_number - 1]
+        if ocr_text.strip():
+            routed[page_number - 1] = ("ocr", ocr_text)
+        elif not layer_text.strip():
+            routed[page_number - 1] = ("empty", "")
+    return routed
+
+
+def join_routed_pages(routed: List[Tuple[str, str]]) -> Optional[str]:
+    text = "\n".join(t for _, t in routed if t)
+    return text.strip() or None
+
+
+def summarise_routes(routed: List[Tuple[str, str]]) -> Dict[str, int]:
+    summary = {"pages": len(routed), "text": 0, "ocr": 0, "empty": 0}
+    for source, _ in routed:
+        summary[source] += 1
+    return summary
@@ -0,0 +1,226 @@
+"""
+pdf_parse_pool.py
+=================
+
+Process pool for PDF parsing.
+
+pdfplumber / pdfminer are pure Python, so parsing on the default thread
+executor serialises on the GIL no matter how many papers are in flight.
+:class:`PDFParsePool` runs the parsers in worker processes instead:
+
+```python
+text  = await parse_pool.extract_pdf(raw_bytes)
+pages = await parse_pool.read_pdf_pages("/path/to/paper.pdf")
+title, confidence = await parse_pool.layout_title("/path/to/paper.pdf")
+```
+
+PDF bytes are not pickled through the pool pipe.  Files already on disk are
+handed over by path; in‑memory bodies are written once to a temp file
+(``/dev/shm`` when available) that the worker opens and the parent deletes.
+
+``pdf_parse_workers`` (env, default ``os.cpu_count()``) sets the worker count
+and ``pdf_parse_queue`` (default twice the worker count) caps how many parses
+may be queued or running at once; callers beyond that wait their turn.
+
+For long documents :meth:`PDFParsePool.iter_pdf_pages` is an async
+generator that yields pages as soon as they are parsed, so downstream LLM
+cleaning can start before the last page is read:
+
+```python
+async for page_number, text in parse_pool.iter_pdf_pages(path):
+    ...
+```
+
+One worker task opens the document once and reads its pages in order,
+sending them back through a manager queue: the first page on its own, then
+batches of ``pdf_page_batch`` pages (default 4).  At most
+``pdf_parse_lookahead`` batches (default 2) wait for the consumer before the
+worker pauses.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from functions_and_classes.pdf_backends import extract_pdf, get_backend
+from functions_and_classes.pdf_cache import sha256_of, sha256_of_file
+from functions_and_classes.pdf_ocr import configure_ocr_share, join_routed_pages, summarise_routes
+from functions_and_classes.pdf_text_cache import text_cache
+from functions_and_classes.pdf_title import read_layout_title, record_layout_title
+
+
+def read_pdf_pages(path: str) -> List[str]:
+    """Raw text-layer text for every page of *path*, served from the text cache when possible."""
+    backend = get_backend()
+    pdf_hash = sha256_of_file(path)
+    extractor = f"pages:{backend.name}"
+    pages = text_cache.get(pdf_hash, extractor)
+    if pages is not None:
+        return pages
+    pages = backend.extract_pages(path)
+    text_cache.put(pdf_hash, extractor, pages)
+    return pages
+
+
+def stream_pdf_pages(path: str, out, stop, batch_size: int):
+    """
+    Worker side of :meth:`PDFParsePool.iter_pdf_pages`: put lists of page
+    texts on *out* in page order, then ``None``.  Gives up once *stop* is set.
+    """
+    batch = []
+    try:
+        for index, text in enumerate(get_backend().iter_pages(path)):
+            batch.append(text)
+            if index == 0 or len(batch) >= batch_size:
+                if stop.is_set():
+                    return
+                out.put(batch)
+                batch = []
+        if batch and not stop.is_set():
+            out.put(batch)
+    finally:
+        if not stop.is_set():
+            out.put(None)
+
+
+def extract_pdf_file(path: str, with_summary: bool = False):
+    with open(path, "rb") as f:
+        return extract_pdf(f.read(), with_summary=with_summary)
+
+
+class PDFParsePool:
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("pdf_parse_workers", os.cpu_count() or 1))
+        self.max_pending = max_pending or int(os.getenv("pdf_parse_queue", 2 * self.max_workers))
+        default_tmp = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        self.handoff_dir = os.getenv("pdf_parse_tmp", default_tmp)
+        self.page_batch = int(os.getenv("pdf_page_batch", 4))
+        self.lookahead = int(os.getenv("pdf_parse_lookahead", 2))
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+        # Threads blocked on a stream's manager queue, one per document in flight.
+        self._readers: ThreadPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(self.max_pending)
+
+    def _executor_required(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Each worker may OCR; split the machine-wide OCR budget between them.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=configure_ocr_share,
+                initargs=(self.max_workers,),
+            )
+        return self._executor
+
+    def _manager_required(self):
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+            self._readers = ThreadPoolExecutor(max_workers=self.max_pending, thread_name_prefix="pdf-pages")
+        return self._manager
+
+    async def _run(self, fn, *args):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor_required(), fn, *args)
+
+    async def read_pdf_pages(self, path: str) -> List[str]:
+        return await self._run(read_pdf_pages, path)
+
+    async def layout_title(self, path: str) -> Tuple[Optional[str], float]:
+        """pdf_title's font-metric title of *path*, parsed in a worker process."""
+        title, confidence = await self._run(read_layout_title, path)
+        # The stats live in this process, not the worker's.
+        record_layout_title(title, confidence)
+        return title, confidence
+
+    async def iter_pdf_pages(self, path: str) -> AsyncIterator[Tuple[int, str]]:
+        """Yield ``(page_number, text)`` for *path* in order, one slice at a time."""
+        loop = asyncio.get_running_loop()
+        extractor = f"pages:{get_backend().name}"
+        pdf_hash = await loop.run_in_executor(None, sha256_of_file, path)
+        cached_pages = text_cache.get(pdf_hash, extractor)
+        if cached_pages is not None:
+            for page_number, text in enumerate(cached_pages, 1):
+                yield page_number, text
+            return
+
+        manager = self._manager_required()
+        # One spare slot so the sentinel below always fits.
+        out, stop = manager.Queue(maxsize=max(1, self.lookahead) + 1), manager.Event()
+        pages = []
+        async with self._slots:
+            task = loop.run_in_executor(self._executor_required(), stream_pdf_pages, path, out, stop, self.page_batch)
+            try:
+                while True:
+                    get = loop.run_in_executor(self._readers, out.get)
+                    await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED)
+                    if not get.done() and task.exception() is not None:
+                        # The worker process died before its final None.
+                        try:
+                            out.put_nowait(None)
+                        except queue.Full:
+                            pass    # the reader is about to return anyway
+                        await get
+                        await task
+                    batch = await get
+                    if batch is None:
+                        break
+                    for text in batch:
+                        pages.append(text)
+                        yield len(pages), text
+                await task
+            finally:
+                if not task.done():
+                    # Consumer gone early: stop the worker, unblock its put and
+                    # wake any reader still waiting on the queue.
+                    stop.set()
+                    try:
+                        while True:
+                            out.get_nowait()
+                    except queue.Empty:
+                        pass
+                    out.put_nowait(None)
+        text_cache.put(pdf_hash, extractor, pages)
+
+    async def extract_pdf(self, pdf_data: bytes, with_summary: bool = False):
+        """
+        Parse in‑memory PDF bytes in a worker process and return the joined
+        text, plus the per‑page routing summary when *with_summary* is set.
+        """
+        # Cache hits are answered here without a round trip through the pool.
+        routed = text_cache.get(sha256_of(pdf_data), f"extract_pdf:{get_backend().name}")
+        if routed is not None:
+            text = join_routed_pages(routed)
+            return (text, summarise_routes(routed)) if with_summary else text
+
+        async with self._slots:
+            fd, path = tempfile.mkstemp(suffix=".pdf", dir=self.handoff_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pdf_data)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor_required(), extract_pdf_file, path, with_summary
+                )
+            finally:
+                try:
+                    os.remove(path)
+                except OSError as exc:
+                    logging.warning(f"could not remove parse handoff file {path}: {exc}")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._readers.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._manager = self._readers = None
+
+
+parse_pool = PDFParsePool()
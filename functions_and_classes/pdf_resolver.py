@@ -5,14 +5,23 @@ pdf_resolver.py
 Asynchronous DOI / landing‑page → PDF resolver supporting many major
 publishers (Springer, OUP, Wiley, F1000Research, Hindawi, etc.).
 
-The class exposes an **async context‑manager** interface so HTTP resources
-are cleaned up automatically:
+One resolver is meant to live for the whole run: every instance shares a
+single pooled HTTP/2 ``httpx.AsyncClient`` (see http_client.py) and the
+pooled browser contexts, so TLS sessions to publishers are reused across
+papers.  Close both once at shutdown:
 
 ```python
-async with PDFResolver() as resolver:
-    pdf_url = await resolver.get_pdf(doi, landing_url, paper_id)
+resolver = PDFResolver(selector_timeout=40_000)
+text = await resolver.get_pdf(doi, paper_id)
+...
+await PDFResolver.shutdown()
 ```
 
+``async with PDFResolver(...)`` still works and leaves the shared resources
+open.  Landing URLs and HTML are cached in ``<cache_dir>/landing.sqlite3``,
+capped at ``landing_cache_max_mb`` (env, default 512); expired rows are
+purged at shutdown.
+
 If no PDF can be located it raises :class:`CantDownload`; if neither a DOI
 nor a landing URL is supplied it raises :class:`MissingIdentifier`.
 """
@@ -23,26 +32,31 @@ nor a landing URL is supplied it raises :class:`MissingIdentifier`.
 
 
 import re 
-import io
 from bs4 import BeautifulSoup
 from typing import Optional , AsyncIterator , List
 import urllib.parse
-import requests
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright , Playwright , Browser , TimeoutError as PWTimeoutError, Page
-import asyncio , functools
+import asyncio
 import os
+import time
 from typing import Optional
 from urllib.parse import quote , urlparse , urljoin
 import httpx
-from httpx import Timeout, AsyncClient
+from httpx import AsyncClient
 import random
 from playwright_stealth import stealth_async
 import logging
-import pdfplumber , pytesseract
-from pdf2image import convert_from_bytes
 import random
 from playwright.async_api import BrowserContext 
+from functions_and_classes.pdf_cache import cache_root, pdf_cache
+from functions_and_classes.pdf_parse_pool import parse_pool
+from functions_and_classes.ttl_cache import SQLiteTTLCache
+from functions_and_classes.strategy_stats import strategy_stats
+from functions_and_classes.browser_pool import BrowserContextPool
+from functions_and_classes.http_client import build_async_client, connection_stats
+from functions_and_classes.rate_limit import host_limiter, limited_api_get
+from functions_and_classes.crossref_client import crossref
 
 load_dotenv()
 
@@ -61,36 +75,14 @@ logging.basicConfig(
 )
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
 
+# DOI → landing URL mappings rarely change; landing HTML goes stale faster.
+LANDING_URL_TTL = float(os.getenv("landing_url_ttl_days", 30)) * 86400
+LANDING_HTML_TTL = float(os.getenv("landing_html_ttl_hours", 24)) * 3600
+landing_cache = SQLiteTTLCache(
+    os.path.join(cache_root, "landing.sqlite3"),
+    max_bytes=int(float(os.getenv("landing_cache_max_mb", 512)) * 1024 * 1024),
+)
 
-def extract_text_with_ocr(pdf_bytes):
-    images = convert_from_bytes(pdf_bytes)
-    full_text = []
-    for i, img in enumerate(images):
-        text = pytesseract.image_to_string(img)
-        if text:
-            full_text.append(text)
-    return "\n".join(full_text).strip() if full_text else None
-
-
-def extract_pdf(pdf_data): 
-     
-    extracted_text = []
-
-    try:
-        with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
-                for pdf_page in pdf.pages:
-                    page_text = pdf_page.extract_text()
-                    if page_text:
-                        extracted_text.append(page_text)
-    except Exception as e:
-        print(f"pdfplumber failed: {e}")
-
-    if not extracted_text:
-        print("Falling back to OCR...")
-        ocr_text = extract_text_with_ocr(pdf_data)
-        return ocr_text
-
-    return "\n".join(extracted_text).strip() if extracted_text else None
 
 def drop_www(host:str) -> str: 
     return host[4:] if host.startswith("www.") else host
@@ -119,6 +111,8 @@ JOURNAL_PDF_SELECTORS = {
 class PDFResolver:
     playwright: Playwright | None = None
     browser : Browser| None = None
+    contexts: BrowserContextPool | None = None
+    client: AsyncClient | None = None
     lock: asyncio.Lock = asyncio.Lock()
     def __init__(self, *, selector_timeout: int  , client: Optional[AsyncClient] = None):
         self._client = client
@@ -212,24 +206,35 @@ class PDFResolver:
             super().__init__(f"Could not download PDF for DOI {doi} from {landing}")
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(headers=self.headers, follow_redirects=True, timeout=self.timeout)
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        # The HTTP client and browser are shared; see PDFResolver.shutdown().
+        pass
 
     def _client_required(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                headers=self.headers, 
-                follow_redirects=True, 
-                timeout=Timeout(15.0, read=30.0), 
-                http2=True)
-        return self._client
+        if self._client is not None:
+            return self._client
+        if PDFResolver.client is None or PDFResolver.client.is_closed:
+            PDFResolver.client = build_async_client(self.headers)
+        return PDFResolver.client
+
+    @classmethod
+    async def close_client(cls):
+        if cls.client is not None:
+            print(f"[resolver] connections: {connection_stats.snapshot()}")
+            await cls.client.aclose()
+            cls.client = None
+
+    @classmethod
+    async def shutdown(cls):
+        await cls.close_client()
+        await cls.close_browser()
+        purged = await asyncio.to_thread(landing_cache.purge_expired)
+        if purged:
+            logging.info(f"[resolver] purged {purged} expired landing cache entries")
     
-    async def context_required(self) -> BrowserContext: 
+    async def _new_context(self, domain: str) -> BrowserContext: 
         async with PDFResolver.lock:
             if PDFResolver.browser is None:
                 PDFResolver.playwright = await async_playwright().start()
@@ -256,6 +261,30 @@ class PDFResolver:
             """
         )
         return context
+
+    def browser_context(self, domain: str):
+        """
+        ``async with resolver.browser_context(domain) as context:`` – a pooled
+        context for *domain*, shared by every resolver (see browser_pool.py).
+        """
+        if PDFResolver.contexts is None:
+            PDFResolver.contexts = BrowserContextPool(self._new_context)
+        return PDFResolver.contexts.acquire(domain)
+
+    @classmethod
+    async def close_browser(cls):
+        """Close the pooled contexts, then the shared browser and Playwright."""
+        async with cls.lock:
+            if cls.contexts is not None:
+                print(f"[resolver] browser contexts: {cls.contexts.stats()}")
+                await cls.contexts.close()
+                cls.contexts = None
+            if cls.browser is not None:
+                await cls.browser.close()
+                cls.browser = None
+            if cls.playwright is not None:
+                await cls.playwright.stop()
+                cls.playwright = None
     
     def _springer_candidates(self, landing: str, doi: str) -> List[str]:
         base = f"https://{self._SPRINGER_HOST}"
@@ -287,8 +316,7 @@ class PDFResolver:
         return None
 
     async def _oup_pdf(self, landing: str) -> Optional[str]:
-        client = await self._client_required()
-        html = (await client.get(landing)).text
+        html = await self.landing_html(landing)
         oup_meta = self._extract_meta_pdf(html)
         try: 
             meta_response = await self.try_pdf_http(oup_meta)
@@ -325,7 +353,7 @@ class PDFResolver:
                 return url_response
         #htmlparse 
         
-        html = (await client.get(landing)).text
+        html = await self.landing_html(landing)
         soup = BeautifulSoup(html, "html.parser")
         btn = soup.find("a", class_="pdf-download-link", href=True)
         if btn:
@@ -351,7 +379,7 @@ class PDFResolver:
                 return url_response 
     
         #meta tag
-        html = (await client.get(landing)).text
+        html = await self.landing_html(landing)
         if (meta:= self._extract_meta_pdf(html)):
             resolved_tand_meta = urllib.parse.urljoin(landing, meta)
             try: 
@@ -383,7 +411,7 @@ class PDFResolver:
             if url_response: 
                 return r 
         
-        html = (await client.get(landing)).text
+        html = await self.landing_html(landing)
         if (meta:= self._extract_meta_pdf(html)):
             resolved_sage_meta = urllib.parse.urljoin(landing, meta)
             try:
@@ -408,7 +436,7 @@ class PDFResolver:
         
         #must get article id 
         
-        html = (await client.get(landing)).text
+        html = await self.landing_html(landing)
         soup = BeautifulSoup(html, "html.parser")
         tag = soup.find("meta", attrs={"name": "dc.identifier"})
         if not tag or not tag.get("data-article-id"):
@@ -448,10 +476,26 @@ class PDFResolver:
         str | None
             Extracted text if successful, otherwise *None*.
         """
-        if context is None: 
-            context =  await self.context_required()
+        raw = pdf_cache.get(url)
+        if raw is not None:
+            print('Loaded cached PDF for URL:', url)
+        else:
+            if context is None: 
+                async with self.browser_context(drop_www(urlparse(url).netloc.lower())) as context:
+                    raw = await self._download_pdf(context, url)
+            else:
+                raw = await self._download_pdf(context, url)
+            if not raw:
+                return None
+            print('Successfully Extracted PDF from URL:', url)
+            pdf_cache.put(url, raw)
+        text = await parse_pool.extract_pdf(raw)
+        if text:
+            return text or None
+
+    async def _download_pdf(self, context: BrowserContext, url: str) -> Optional[bytes]:
         try:
-            resp = await context.request.get(url, timeout=self.selector_timeout)
+            resp = await limited_api_get(context, url, timeout=self.selector_timeout)
         except Exception as exc:
             print(f"[resolver]   GET failed for {url!s}: {exc}")
             return None
@@ -466,14 +510,7 @@ class PDFResolver:
             return None
 
         # Confirm first bytes contain %PDF-magic
-        raw = await resp.body()
-        if not raw:
-            return None
-        print('Successfully Extracted PDF from URL:', url)
-        loop = asyncio.get_running_loop()
-        text = await loop.run_in_executor(None, functools.partial(extract_pdf, raw))
-        if text:
-            return text or None
+        return await resp.body() or None
     
     
     async def try_pdf_http(self,url:str):
@@ -481,26 +518,30 @@ class PDFResolver:
         Download *url* with httpx, verify it is a PDF (%PDF magic),
         then return extracted text (or None on failure).
         """
-        client = self._client_required()
-        try:
-            resp = await client.get(url, timeout=15)
-        except Exception as exc:
-            print(f"[resolver] httpx GET failed: {exc}")
-            return None
+        raw = pdf_cache.get(url)
+        if raw is not None:
+            print('Loaded cached PDF for URL:', url)
+        else:
+            client = self._client_required()
+            try:
+                resp = await client.get(url, timeout=15)
+            except Exception as exc:
+                print(f"[resolver] httpx GET failed: {exc}")
+                return None
 
-        if resp.status_code != 200:
-            return None
+            if resp.status_code != 200:
+                return None
 
-        ctype = resp.headers.get("content-type", "").lower()
-        if "pdf" not in ctype and not url.lower().endswith(".pdf"):
-            return None
+            ctype = resp.headers.get("content-type", "").lower()
+            if "pdf" not in ctype and not url.lower().endswith(".pdf"):
+                return None
 
-        raw = resp.content
-        if not raw:
-            return None
-        print('Successfully downloaded PDF from URL:', url)
-        loop = asyncio.get_event_loop()
-        text = await loop.run_in_executor(None, functools.partial(extract_pdf, raw))
+            raw = resp.content
+            if not raw:
+                return None
+            print('Successfully downloaded PDF from URL:', url)
+            pdf_cache.put(url, raw)
+        text = await parse_pool.extract_pdf(raw)
         if text: 
             return text or None
     
@@ -553,7 +594,7 @@ class PDFResolver:
                 return None
 
             resolved = urljoin(page.url, href)
-            text     = await self.try_pdf_url(resolved)
+            text     = await self.try_pdf_url(resolved, page.context)
             return text                 # None when not a PDF / could not extract
         except PWTimeoutError:
             return None
@@ -567,7 +608,7 @@ class PDFResolver:
             return None                     # no PDF button found
         try:
             resolved_href = urljoin(page.url, href_btn)
-            href_response = await self.try_pdf_url(resolved_href)
+            href_response = await self.try_pdf_url(resolved_href, page.context)
             if href_response: 
                 return href_response
         except TimeoutError:
@@ -599,7 +640,7 @@ class PDFResolver:
                 
                 anchor_link = urljoin(page.url, href)
                 try:
-                    anchor_response = await self.try_pdf_url(anchor_link)
+                    anchor_response = await self.try_pdf_url(anchor_link, page.context)
                     if anchor_response: 
                         return anchor_response
                 except Exception as e:
@@ -612,7 +653,7 @@ class PDFResolver:
         if not  current_url.lower().endswith(".pdf") or "pdf" in current_url.lower():
             return None
         try:
-            redirect_response = await self.try_pdf_url(current_url)
+            redirect_response = await self.try_pdf_url(current_url, page.context)
             if redirect_response: 
                 return redirect_response
         except Exception as e: 
@@ -621,21 +662,25 @@ class PDFResolver:
             
     async def try_browser_strategies(self, domain:str,page: Page) -> str | None:
         """
-        Run the **four** browser strategies in order.
+        Run the **four** browser strategies, in the order strategy_stats
+        suggests for *domain*.
         Return extracted text or *None* when everything fails.
         """
         
-        strategies = [
-            self.find_via_selector,
-            self.find_via_redirect,
-            self.find_pdf_button,
-            self.find_via_anchor
-        ]
-        for fn in strategies:
+        strategies = {
+            "browser:selector": self.find_via_selector,
+            "browser:redirect": self.find_via_redirect,
+            "browser:button": self.find_pdf_button,
+            "browser:anchor": self.find_via_anchor,
+        }
+        for name in strategy_stats.order(domain, list(strategies)):
+            fn = strategies[name]
+            started = time.perf_counter()
             try:
                 text = await fn(domain, page) if fn is self.find_via_selector else await fn(page)
             except Exception:
-                continue
+                text = None
+            strategy_stats.record(domain, name, bool(text), time.perf_counter() - started)
             if text:                # one of the strategies succeeded
                 return text  
         # All four strategies failed
@@ -657,128 +702,151 @@ class PDFResolver:
         if not username or not password:
             raise RuntimeError("Missing EZProxy credentials.")
 
-        context = await self.context_required()
-        async with await  context.new_page() as page:
+        async with self.browser_context(domain) as context:
+            page = await context.new_page()
             try:
-                await stealth_async(page)
-            except ImportError:
-                logging.warning("playwright_stealth not installed; continuing without stealth")
+                try:
+                    await stealth_async(page)
+                except ImportError:
+                    logging.warning("playwright_stealth not installed; continuing without stealth")
 
-            await page.goto(landing_url, wait_until='networkidle')
-                
-            text = await self.try_browser_strategies(domain,page)
-            if text:
-                return text
-            print("All browser methods failed to extract PDF.")
+                async with host_limiter.limit_async(landing_url):
+                    await page.goto(landing_url, wait_until='networkidle')
+                    
+                text = await self.try_browser_strategies(domain,page)
+                if text:
+                    return text
+                print("All browser methods failed to extract PDF.")
 
-            return None
+                return None
+            finally:
+                # Pooled contexts outlive the request; their pages must not.
+                await page.close()
         
+    async def resolve_landing(self, doi: str) -> str:
+        """
+        Final landing URL for *doi*, from the landing cache when possible.
+        The redirect chain is followed with HEAD; publishers that refuse HEAD
+        get a streamed GET whose body is never read.
+        """
+        key = doi.strip().lower()
+        cached = landing_cache.get("doi_landing", key)
+        if cached:
+            return cached
+
+        client = self._client_required()
+        doi_url = f"https://doi.org/{doi}"
+        landing = None
+        try:
+            resp = await client.head(doi_url)
+            if resp.status_code not in (403, 405, 501) and resp.url.host != "doi.org":
+                landing = str(resp.url)
+        except httpx.HTTPError as exc:
+            print(f"[resolver] HEAD {doi_url} failed: {exc}")
+        if landing is None:
+            async with client.stream("GET", doi_url) as resp:
+                landing = str(resp.url)
+
+        if urlparse(landing).hostname != "doi.org":
+            landing_cache.put("doi_landing", key, landing, ttl=LANDING_URL_TTL)
+        return landing
+
+    async def landing_html(self, landing: str) -> str:
+        """HTML of *landing*, kept in the landing cache for ``landing_html_ttl_hours``."""
+        cached = landing_cache.get("landing_html", landing)
+        if cached is not None:
+            return cached
+        resp = await self._client_required().get(landing)
+        if resp.status_code == 200 and LANDING_HTML_TTL > 0:
+            landing_cache.put("landing_html", landing, resp.text, ttl=LANDING_HTML_TTL)
+        return resp.text
+
     @staticmethod
     def _extract_meta_pdf(html: str) -> Optional[str]:
         tag = BeautifulSoup(html, "html.parser").find("meta", attrs={"name": "citation_pdf_url"})
         return tag["content"].strip() if tag and tag.get("content") else None
     
     @staticmethod
-    def _crossref_fallback(doi: str) -> Optional[str]:
-        try:
-            r = requests.get(f"https://api.crossref.org/works/{doi}", timeout=15)
-            r.raise_for_status()
-            data = r.json()
-        except Exception:
-            return None
-        links = data.get("message", {}).get("link", [])
-        best = None
-        for link in links:
-            ct = link.get("content-type")
-            url = link.get("URL")
-            if ct == "text/html":
-                return url
-            if ct == "application/pdf" and best is None:
-                best = url
-            if url and url.endswith(".pdf") and best is None:
-                best = url
-        return best 
+    async def _crossref_fallback(doi: str) -> Optional[str]:
+        return await crossref.document_link_for_doi(doi)
 
     
     
-    async def get_pdf(self, doi, paper_id ) -> str:
-        print(f"Attempting to resolve pdf of paper_id: {paper_id}")
-        client = self._client_required()
-        if doi: 
-            landing = str((await client.get(f"https://doi.org/{doi}")).url)
-        else:
-            return self.MissingIdentifier()
-        print(f"Attempting to resolve pdf from : {landing}")
+    async def _via_springer(self, landing: str, doi: str) -> Optional[str]:
+        print("Trying with Springer landing page.")
+        for springer_url in self._springer_candidates(landing, doi):
+            try: 
+                springer_url = await self.try_pdf_url(springer_url)
+            except Exception as e:
+                continue
+            if springer_url:
+                print("Extracted PDF from Springer landing page.")
 
-        if self._SPRINGER_HOST in landing:
-            print("Trying with Springer landing page.")
-            for springer_url in self._springer_candidates(landing, doi):
-                try: 
-                    springer_url = await self.try_pdf_url(springer_url)
-                except Exception as e:
-                    continue
-                if springer_url:
-                    print("Extracted PDF from Springer landing page.")
+                return springer_url
+        return None
 
-                    return springer_url
+    async def _via_hindawi(self, landing: str, doi: str) -> Optional[str]:
+        print("Trying with Hindawi landing page.")
+        for hindawi_paper in (landing, f"https://doi.org/{doi}"):
+            try:
+                hindawi_url = await self.try_pdf_url(hindawi_paper)
+            except Exception as e:
+                continue
+            if hindawi_url:
+                print("Extracting PDF from Hindawi landing page.")
+                return hindawi_url
+        return None
 
-        if self._HINDAWI_DOWNLOAD_RE.match(landing) or self._HINDAWI_LANDING_RE.match(landing):
-            print("Trying with Hindawi landing page.")
-            for hindawi_paper in (landing, f"https://doi.org/{doi}"):
-                try:
-                    hindawi_url = await self.try_pdf_url(hindawi_paper)
-                except Exception as e:
-                    continue
-                if hindawi_url:
-                    print("Extracting PDF from Hindawi landing page.")
-                    return hindawi_url
+    async def _via_f1000(self, landing: str, doi: str) -> Optional[str]:
+        print("Trying with F1000 landing page.")
+        f100_pdf = await self._f1000_pdf(landing, doi)
+        if f100_pdf:
+            print("Extracted PDF from F1000 landing page.")
+        return f100_pdf
+
+    async def _via_oup(self, landing: str, doi: str) -> Optional[str]:
+        print("Trying with OUP landing page.")
+        oup_pdf = await self._oup_pdf(landing)
+        if oup_pdf:
+            print("Extracted PDF from OUP landing page.")
+        return oup_pdf
+
+    async def _via_wiley(self, landing: str, doi: str) -> Optional[str]:
+        print("Trying with Wiley landing page.")
+        wiley_pdf = await self._wiley_pdf(landing, doi)
+        if wiley_pdf:
+            print("Extracted PDF from Wiley landing page.")
+        return wiley_pdf
+
+    async def _via_anchor(self, landing: str, doi: str) -> Optional[str]:
+        html = await self.landing_html(landing)
+        anchor = self._extract_anchor_pdf_score(html, landing)
+        if not anchor:
+            return None
+        print("Trying with anchor hint matching.")
 
-        if self._F1000_HOST_RE.match(landing):
-            print("Trying with F1000 landing page.")
-            f100_pdf = await self._f1000_pdf(landing, doi)
-            if f100_pdf:
-                print("Extracted PDF from F1000 landing page.")
-                return f100_pdf
+        try: 
+            anchor_pdf = await self.try_pdf_url(anchor)
+        except Exception as e:
+            anchor_pdf = None
+        if anchor_pdf:
+            print("Extracted PDF via anchor hint.")
+        return anchor_pdf
 
-        if self._OUP_HOST_RE.match(landing):
-            print("Trying with OUP landing page.")
-            oup_pdf = await self._oup_pdf(landing)
-            if oup_pdf:
-                print("Extracted PDF from OUP landing page.")
-                return oup_pdf
-        
-        
-        if "onlinelibrary.wiley.com" in landing:
-            print("Trying with Wiley landing page.")
-            wiley_pdf = await self._wiley_pdf(landing, doi)
-            if wiley_pdf:
-                print("Extracted PDF from Wiley landing page.")
-                return wiley_pdf
-            
-        html = (await client.get(landing)).text
-        anchor = self._extract_anchor_pdf_score(html, landing)
-        if anchor:
-            print("Trying with anchor hint matching.")
+    async def _via_crossref(self, landing: str, doi: str) -> Optional[str]:
+        if not doi or not (cross := await self._crossref_fallback(doi)):
+            return None
+        print("Trying with crossref fallback.")
 
-            try: 
-                anchor_pdf = await self.try_pdf_url(anchor)
-            except Exception as e:
-                anchor_pdf = None
-            if anchor_pdf:
-                print("Extracted PDF via anchor hint.")
-                return anchor_pdf
-        
-        if doi and (cross := self._crossref_fallback(doi)):
-            print("Trying with crossref fallback.")
+        try: 
+            cross_ref_pdf = await self.try_pdf_url(cross)
+        except Exception as e:
+            cross_ref_pdf = None
+        if cross_ref_pdf:
+            print("Extracted PDF via CrossRef fallback.")
+        return cross_ref_pdf
 
-            try: 
-                cross_ref_pdf = await self.try_pdf_url(cross)
-            except Exception as e:
-                cross_ref_pdf = None
-            if cross_ref_pdf:
-                print("Extracted PDF via CrossRef fallback.")
-                return cross_ref_pdf
-                
+    async def _via_browser(self, landing: str, doi: str) -> Optional[str]:
         print("Trying with browser automation to extract PDF.")
         try:
             browser_pdf = await self.fetch_pdf_with_browser(landing)
@@ -786,8 +854,48 @@ class PDFResolver:
             browser_pdf = None
         if browser_pdf:
             print("Extrated PDF via browser automation.")
-            return browser_pdf
-        
+        return browser_pdf
+
+    def _landing_strategies(self, landing: str) -> dict:
+        """Strategies that apply to *landing*, in the default order."""
+        strategies = {}
+        if self._SPRINGER_HOST in landing:
+            strategies["springer"] = self._via_springer
+        if self._HINDAWI_DOWNLOAD_RE.match(landing) or self._HINDAWI_LANDING_RE.match(landing):
+            strategies["hindawi"] = self._via_hindawi
+        if self._F1000_HOST_RE.match(landing):
+            strategies["f1000"] = self._via_f1000
+        if self._OUP_HOST_RE.match(landing):
+            strategies["oup"] = self._via_oup
+        if "onlinelibrary.wiley.com" in landing:
+            strategies["wiley"] = self._via_wiley
+        strategies["anchor"] = self._via_anchor
+        strategies["crossref"] = self._via_crossref
+        strategies["browser"] = self._via_browser
+        return strategies
+
+    async def get_pdf(self, doi, paper_id ) -> str:
+        print(f"Attempting to resolve pdf of paper_id: {paper_id}")
+        if doi: 
+            landing = await self.resolve_landing(doi)
+        else:
+            return self.MissingIdentifier()
+        print(f"Attempting to resolve pdf from : {landing}")
+
+        # Strategies are reordered (or skipped) per domain from recorded
+        # success rates; see strategy_stats.py.
+        domain = drop_www(urlparse(landing).netloc.lower())
+        strategies = self._landing_strategies(landing)
+        for name in strategy_stats.order(domain, list(strategies)):
+            started = time.perf_counter()
+            try:
+                text = await strategies[name](landing, doi)
+            except Exception as e:
+                print(f"[resolver] {name} strategy failed: {e}")
+                text = None
+            strategy_stats.record(domain, name, bool(text), time.perf_counter() - started)
+            if text:
+                return text
 
         raise self.CantDownload(doi , landing)
 
@@ -0,0 +1,172 @@
+"""
+pdf_text_cache.py
+=================
+
+Persistent cache of extracted PDF text, keyed by the sha256 of the PDF bytes
+and the extractor that produced it.
+
+Text is stored per page (a JSON list) so callers that work page by page can
+reuse it directly.  Each extractor carries a version in
+:data:`EXTRACTOR_VERSIONS`; bump it whenever the extraction logic changes and
+rows written by older versions are dropped the next time the cache opens.
+``text_cache.invalidate("extract_pdf:pdfminer")`` clears one extractor by hand.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from importlib import metadata
+from typing import List, Optional
+
+from functions_and_classes.pdf_cache import cache_root
+
+# Bump the number when an extractor's output would change for the same bytes.
+# Cache keys are "<extractor>:<backend>", e.g. "extract_pdf:pdfminer".
+EXTRACTOR_VERSIONS = {
+    "extract_pdf": 3,   # [source, text] per page: text layer with per-page OCR fallback
+    "pages": 1,         # raw text-layer pages, used by the s3 parse stage
+}
+
+# Distribution whose version also keys the cache for each backend.
+BACKEND_PACKAGES = {
+    "pdfplumber": "pdfplumber",
+    "pdfminer": "pdfminer.six",
+    "pypdfium2": "pypdfium2",
+}
+
+
+@lru_cache(maxsize=None)
+def extractor_version(extractor: str) -> Optional[str]:
+    """Current version string for *extractor*, or *None* for unknown extractors."""
+    base, _, backend = extractor.partition(":")
+    if base not in EXTRACTOR_VERSIONS:
+        return None
+    package = BACKEND_PACKAGES.get(backend or "pdfplumber", backend)
+    try:
+        library = f"{package}-{metadata.version(package)}"
+    except metadata.PackageNotFoundError:
+        library = f"{package}-unknown"
+    return f"{EXTRACTOR_VERSIONS[base]}+{library}"
+
+
+class PDFTextCache:
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = path or os.path.join(cache_root, "pdf_text.sqlite3")
+        if max_bytes is None:
+            max_bytes = int(os.getenv("text_cache_max_bytes", 2 * 1024 ** 3))
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        # Parse workers are forked from the pipeline; each child needs its own
+        # SQLite handle and a lock nobody else can be holding.
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            " sha256 TEXT NOT NULL, extractor TEXT NOT NULL, version TEXT NOT NULL,"
+            " pages TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (sha256, extractor))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS texts_lru ON texts(last_access)")
+
+        self.hits = 0
+        self.misses = 0
+        self.purge_stale()
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def get(self, sha: str, extractor: str) -> Optional[List[str]]:
+        """Return the cached pages for *sha* or *None* on a miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pages FROM texts WHERE sha256 = ? AND extractor = ? AND version = ?",
+                (sha, extractor, extractor_version(extractor)),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE texts SET last_access = ? WHERE sha256 = ? AND extractor = ?",
+                (time.time(), sha, extractor),
+            )
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, sha: str, extractor: str, pages: List[str]):
+        payload = json.dumps(pages)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO texts (sha256, extractor, version, pages, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (sha, extractor, extractor_version(extractor), payload, len(payload), time.time()),
+            )
+            self._evict()
+
+    def invalidate(self, extractor: Optional[str] = None):
+        """Drop every row for *extractor* (or the whole cache when omitted)."""
+        with self._lock:
+            if extractor is None:
+                self._db.execute("DELETE FROM texts")
+            else:
+                self._db.execute("DELETE FROM texts WHERE extractor = ?", (extractor,))
+
+    def purge_stale(self):
+        """Drop rows written by an extractor version other than the current one."""
+        with self._lock:
+            extractors = [
+                row[0] for row in self._db.execute("SELECT DISTINCT extractor FROM texts").fetchall()
+            ]
+            for extractor in extractors:
+                version = extractor_version(extractor)
+                if version is None:
+                    self._db.execute("DELETE FROM texts WHERE extractor = ?", (extractor,))
+                else:
+                    self._db.execute(
+                        "DELETE FROM texts WHERE extractor = ? AND version != ?",
+                        (extractor, version),
+                    )
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM texts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha, extractor, size in self._db.execute(
+            "SELECT sha256, extractor, size FROM texts ORDER BY last_access ASC"
+        ).fetchall():
+            self._db.execute(
+                "DELETE FROM texts WHERE sha256 = ? AND extractor = ?", (sha, extractor)
+            )
+            total -= size
+            logging.info(f"text cache evicted {extractor} text for {sha}")
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM texts"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": rows,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+text_cache = PDFTextCache()
@@ -0,0 +1,135 @@
+"""
+pipeline.py
+===========
+
+Minimal building blocks for staged asyncio pipelines: every :class:`Stage`
+owns a bounded input queue and a fixed number of workers, so a slow stage
+pushes back on the ones feeding it instead of letting work pile up in
+memory.
+
+```python
+parse = Stage("parse", handle_parse, workers=4, maxsize=8)
+title = Stage("title", handle_title, workers=2, maxsize=8)
+for stage in (parse, title):
+    stage.start()
+await parse.put(job)
+...
+monitor = asyncio.create_task(report_stages([parse, title], every=30))
+```
+
+A handler gets one item and is responsible for passing it on (``await
+next_stage.put(item)``).  Time a handler spends blocked in such a hand‑off
+is not counted as busy time.  If it raises, ``on_error(item, exc)`` is
+awaited so the caller can still account for the item.  :meth:`Stage.stats`
+and :func:`format_stage_stats` expose queue depth, busy workers and
+throughput.
+"""
+
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+Handler = Callable[[Any], Awaitable[None]]
+ErrorHandler = Callable[[Any, BaseException], Awaitable[None]]
+
+# Seconds the current handler has spent waiting on downstream queues.
+_handoff_wait: contextvars.ContextVar = contextvars.ContextVar("handoff_wait", default=None)
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        handler: Handler,
+        workers: int,
+        maxsize: Optional[int] = None,
+        on_error: Optional[ErrorHandler] = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize if maxsize is not None else 2 * self.workers)
+        self.on_error = on_error
+
+        self.busy = 0
+        self.done = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def put(self, item: Any):
+        start = time.perf_counter()
+        await self.queue.put(item)
+        waited = _handoff_wait.get()
+        if waited is not None:
+            waited[0] += time.perf_counter() - start
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            self.busy += 1
+            waited = [0.0]
+            token = _handoff_wait.set(waited)
+            start = time.perf_counter()
+            try:
+                await self.handler(item)
+                self.done += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.failed += 1
+                print(f"[{self.name}] failed: {exc}")
+                if self.on_error is not None:
+                    await self.on_error(item, exc)
+            finally:
+                self.busy -= 1
+                self.busy_seconds += time.perf_counter() - start - waited[0]
+                _handoff_wait.reset(token)
+                self.queue.task_done()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        handled = self.done + self.failed
+        return {
+            "stage": self.name,
+            "queued": self.queue.qsize(),
+            "maxsize": self.queue.maxsize,
+            "busy": self.busy,
+            "workers": self.workers,
+            "done": self.done,
+            "failed": self.failed,
+            "per_min": 60 * handled / elapsed if elapsed else 0.0,
+            "mean_s": self.busy_seconds / handled if handled else 0.0,
+        }
+
+
+def format_stage_stats(stages: Iterable[Stage]) -> str:
+    lines = [f"{'stage':<16} {'queued':>9} {'busy':>7} {'done':>7} {'failed':>7} {'per min':>8} {'mean s':>8}"]
+    for stage in stages:
+        s = stage.stats()
+        lines.append(
+            f"{s['stage']:<16} {s['queued']:>4}/{s['maxsize']:<4} {s['busy']:>3}/{s['workers']:<3} "
+            f"{s['done']:>7} {s['failed']:>7} {s['per_min']:>8.1f} {s['mean_s']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+async def report_stages(stages: List[Stage], every: float):
+    """Print :func:`format_stage_stats` every *every* seconds until cancelled."""
+    while True:
+        await asyncio.sleep(every)
+        print(format_stage_stats(stages))
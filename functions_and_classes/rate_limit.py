@@ -0,0 +1,314 @@
+"""
+rate_limit.py
+=============
+
+Central per‑host rate limiting for every outbound HTTP call: Crossref,
+OpenCitations, bioRxiv, doi.org and the publishers the resolver visits.
+
+Each host gets a token bucket (``rate`` requests per second, bursts up to
+``rate``) and a cap on requests in flight.  A 429 / 503 answer blocks the
+host for its ``Retry-After`` (or ``rate_limit_backoff`` seconds, default 5),
+capped at ``rate_limit_max_retry_after`` seconds (default 300), and the call
+is retried, up to ``rate_limit_retries`` times (default 3).
+
+The limiter is shared by threads and the event loop, so sync helpers and
+async clients count against the same budget:
+
+```python
+resp = limited_get("https://api.crossref.org/works/10.1101/123")          # requests
+client = httpx.AsyncClient(transport=RateLimitedTransport())               # httpx
+resp = await limited_api_get(context, url)                                 # Playwright
+async with host_limiter.limit_async(url):                                   # anything else
+    await page.goto(url)
+```
+
+Limits are ``(rate, max_in_flight)`` per host; :data:`DEFAULT_HOST_LIMITS`
+covers the APIs, other hosts get ``rate_limit_default_rate`` /
+``rate_limit_default_in_flight`` (env, default 2 / 4).  Override any host
+with the ``rate_limits`` env variable, e.g.
+``rate_limits='{"api.crossref.org": [20, 8]}'``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+import requests
+
+T = TypeVar("T")
+
+DEFAULT_HOST_LIMITS: Dict[str, Tuple[float, int]] = {
+    # ~14/s is what the old CROSSREF_API_WAIT sleep allowed.
+    "api.crossref.org": (14.0, 5),
+    "opencitations.net": (2.0, 2),
+    "api.biorxiv.org": (4.0, 4),
+    "biorxiv.org": (2.0, 4),
+    "doi.org": (10.0, 8),
+}
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def host_of(url: str) -> str:
+    return (urlparse(str(url)).hostname or "").lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class HostBucket:
+    def __init__(self, rate: float, max_in_flight: int):
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+
+    def reserve(self) -> float:
+        """Take one token, possibly from the future; return how long to wait for it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class HostLimiter:
+    def __init__(self):
+        self.default_rate = float(os.getenv("rate_limit_default_rate", 2))
+        self.default_in_flight = int(os.getenv("rate_limit_default_in_flight", 4))
+        self.backoff = float(os.getenv("rate_limit_backoff", 5))
+        self.max_retries = int(os.getenv("rate_limit_retries", 3))
+        self.max_retry_after = float(os.getenv("rate_limit_max_retry_after", 300))
+        self.limits = dict(DEFAULT_HOST_LIMITS)
+        overrides = os.getenv("rate_limits")
+        if overrides:
+            self.limits.update({host: tuple(v) for host, v in json.loads(overrides).items()})
+
+        self._buckets: Dict[str, HostBucket] = {}
+        self._cond = threading.Condition()
+        # Coroutines waiting for a slot, per host, as (loop, future) pairs.
+        self._async_waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = defaultdict(list)
+        self.counters = defaultdict(lambda: defaultdict(float))
+
+    def _limits_for(self, host: str) -> Tuple[float, int]:
+        # Most specific configured suffix wins: link.springer.com, springer.com, ...
+        parts = host.split(".")
+        for i in range(len(parts) - 1):
+            limit = self.limits.get(".".join(parts[i:]))
+            if limit is not None:
+                return limit
+        return self.default_rate, self.default_in_flight
+
+    def _bucket(self, host: str) -> HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, in_flight = self._limits_for(host)
+            bucket = self._buckets[host] = HostBucket(float(rate), int(in_flight))
+        return bucket
+
+    def _try_enter(self, host: str) -> Optional[float]:
+        # Caller holds self._cond.
+        bucket = self._bucket(host)
+        if bucket.in_flight >= bucket.max_in_flight:
+            return None
+        bucket.in_flight += 1
+        wait = bucket.reserve()
+        self.counters[host]["requests"] += 1
+        self.counters[host]["waited_s"] += wait
+        return wait
+
+    def acquire(self, url: str):
+        host = host_of(url)
+        with self._cond:
+            while (wait := self._try_enter(host)) is None:
+                self._cond.wait()
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            except BaseException:
+                self.release(url)
+                raise
+
+    async def acquire_async(self, url: str):
+        host = host_of(url)
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                wait = self._try_enter(host)
+                if wait is None:
+                    waiter = loop.create_future()
+                    self._async_waiters[host].append((loop, waiter))
+            if wait is not None:
+                break
+            # The slot may be freed by a thread; release() wakes us through our loop.
+            try:
+                await waiter
+            finally:
+                with self._cond:
+                    waiters = self._async_waiters.get(host)
+                    if waiters and (loop, waiter) in waiters:
+                        waiters.remove((loop, waiter))
+        if wait > 0:
+            # The slot is already ours; give it back if we are cancelled while
+            # waiting out the token bucket or a Retry-After.
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                self.release(url)
+                raise
+
+    def release(self, url: str):
+        host = host_of(url)
+        with self._cond:
+            self._bucket(host).in_flight -= 1
+            self._cond.notify_all()
+            waiters = self._async_waiters.pop(host, None) or []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @contextmanager
+    def limit(self, url: str):
+        self.acquire(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    @asynccontextmanager
+    async def limit_async(self, url: str):
+        await self.acquire_async(url)
+        try:
+            yield
+        finally:
+            self.release(url)
+
+    def throttled(self, url: str, status: int, headers) -> Optional[float]:
+        """
+        Record a response.  For 429/503 block the host for its Retry-After and
+        return the delay; otherwise return ``None``.
+        """
+        if status not in THROTTLE_STATUSES:
+            return None
+        host = host_of(url)
+        delay = parse_retry_after(headers.get("retry-after") if headers else None)
+        delay = self.backoff if delay is None else min(delay, self.max_retry_after)
+        with self._cond:
+            bucket = self._bucket(host)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + delay)
+        self.counters[host]["throttled"] += 1
+        logging.warning(f"[rate_limit] {host} answered {status}; pausing it for {delay:.1f}s")
+        return delay
+
+    def stats(self) -> dict:
+        return {host: dict(counters) for host, counters in self.counters.items()}
+
+
+host_limiter = HostLimiter()
+
+
+def _status_of(resp) -> int:
+    status = getattr(resp, "status_code", None)
+    return status if status is not None else getattr(resp, "status", 0)
+
+
+def limited_call(url: str, send: Callable[[], T]) -> T:
+    """Run the sync request *send* under *url*'s host limit, retrying on 429/503."""
+    for attempt in range(host_limiter.max_retries + 1):
+        with host_limiter.limit(url):
+            resp = send()
+        if attempt < host_limiter.max_retries and host_limiter.throttled(url, _status_of(resp), resp.headers) is not None:
+            continue
+        return resp
+    return resp
+
+
+def limited_get(url: str, **kwargs) -> requests.Response:
+    return limited_call(url, lambda: requests.get(url, **kwargs))
+
+
+def limited_post(url: str, **kwargs) -> requests.Response:
+    return limited_call(url, lambda: requests.post(url, **kwargs))
+
+
+async def limited_api_get(context, url: str, **kwargs):
+    """``context.request.get`` for a Playwright context, under *url*'s host limit."""
+    for attempt in range(host_limiter.max_retries + 1):
+        async with host_limiter.limit_async(url):
+            resp = await context.request.get(url, **kwargs)
+        if attempt < host_limiter.max_retries and host_limiter.throttled(url, resp.status, resp.headers) is not None:
+            await resp.dispose()
+            continue
+        return resp
+    return resp
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Keeps the host slot taken until the response body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class RateLimitedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that applies :data:`host_limiter` to every request, redirects included."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        for attempt in range(host_limiter.max_retries + 1):
+            await host_limiter.acquire_async(url)
+            try:
+                response = await super().handle_async_request(request)
+            except BaseException:
+                host_limiter.release(url)
+                raise
+            response.stream = _ReleasingStream(response.stream, lambda: host_limiter.release(url))
+            if attempt < host_limiter.max_retries and host_limiter.throttled(url, response.status_code, response.headers) is not None:
+                await response.aclose()
+                continue
+            return response
+        return response
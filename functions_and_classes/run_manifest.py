@@ -0,0 +1,193 @@
+"""
+run_manifest.py
+===============
+
+Durable record of which input PDFs a run has already written out, so a
+restarted run can skip them instead of appending duplicate records.
+
+```python
+manifest = RunManifest(os.path.join(repo_root, "papers", "manifest.sqlite3"))
+done = manifest.done_names()              # set, O(1) membership per file
+...
+manifest.mark(pdf_name, sha256, "extracted", extract_file_name)
+```
+
+One row per PDF name: content hash, outcome (``extracted`` /
+``unextracted`` / ``unknown``) and the JSONL file its record went to.  Each
+:meth:`mark` is its own SQLite transaction, and writers call it only after
+the JSONL line is flushed, so a crash can at worst repeat the one paper
+that was in between.  :meth:`backfill_from_jsonl` seeds the manifest from
+output files written before it existed.
+
+A crash can also leave the output file ending in half a line; writers call
+:func:`repair_jsonl_tail` before appending so the next record does not merge
+with it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+
+def repair_jsonl_tail(path: str, chunk_size: int = 64 * 1024) -> int:
+    """
+    Make *path* end on a line boundary before it is appended to.  A trailing
+    line that parses as JSON only lost its newline and gets one; anything else
+    is a record cut off mid-write and is truncated (its paper was never marked
+    done, so it is processed again).  Returns the number of bytes dropped.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return 0
+        # Find the start of the last line, reading backwards in chunks.
+        start = size
+        while start > 0:
+            step = min(chunk_size, start)
+            f.seek(start - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline != -1:
+                start = start - step + newline + 1
+                break
+            start -= step
+        f.seek(start)
+        tail = f.read()
+        try:
+            json.loads(tail)
+        except ValueError:
+            f.truncate(start)
+            f.flush()
+            os.fsync(f.fileno())
+            return size - start
+        f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+        return 0
+
+
+class RunManifest:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " pdf_name TEXT PRIMARY KEY, sha256 TEXT, outcome TEXT NOT NULL,"
+            " output_file TEXT NOT NULL, written_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def done_names(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT pdf_name FROM processed")}
+
+    def get(self, pdf_name: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha256, outcome, output_file, written_at FROM processed WHERE pdf_name = ?",
+                (pdf_name,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("sha256", "outcome", "output_file", "written_at"), row), pdf_name=pdf_name)
+
+    def mark(self, pdf_name: str, sha256: Optional[str], outcome: str, output_file: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed (pdf_name, sha256, outcome, output_file, written_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (pdf_name, sha256, outcome, output_file, time.time()),
+            )
+
+    def forget(self, pdf_name: str):
+        with self._lock:
+            self._db.execute("DELETE FROM processed WHERE pdf_name = ?", (pdf_name,))
+
+    def backfill_from_jsonl(self, path: str, outcome: str) -> int:
+        """Add every ``preprint_pdf_name`` in *path* that is not in the manifest yet."""
+        if not os.path.exists(path):
+            return 0
+        rows = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    name = json.loads(line).get("preprint_pdf_name")
+                except ValueError:
+                    # A half-written last line from an interrupted run.
+                    continue
+                if name:
+                    rows.append((name, None, outcome, path, time.time()))
+        with self._lock:
+            before = self._db.total_changes
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR IGNORE INTO processed (pdf_name, sha256, outcome, output_file, written_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.execute("COMMIT")
+            return self._db.total_changes - before
+
+    def names_with_outcome(self, outcome: str) -> List[str]:
+        with self._lock:
+            return [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT pdf_name FROM processed WHERE outcome = ? ORDER BY pdf_name", (outcome,)
+                )
+            ]
+
+    def compact_output(self, path: str) -> int:
+        """
+        Rewrite *path* keeping one line per PDF (the last one), and only for
+        PDFs whose manifest row still points at *path*.  Used after a retry
+        moved papers to another file.  Returns the number of lines dropped.
+        """
+        if not os.path.exists(path):
+            return 0
+        with self._lock:
+            owners = dict(self._db.execute("SELECT pdf_name, output_file FROM processed").fetchall())
+
+        latest: Dict[str, str] = {}
+        total = 0
+        with open(path) as f:
+            for line in f:
+                total += 1
+                try:
+                    name = json.loads(line).get("preprint_pdf_name")
+                except ValueError:
+                    continue
+                if owners.get(name, path) == path:
+                    latest.pop(name, None)
+                    latest[name] = line if line.endswith("\n") else line + "\n"
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.writelines(latest.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return total - len(latest)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT outcome, COUNT(*) FROM processed GROUP BY outcome").fetchall())
@@ -0,0 +1,123 @@
+"""
+strategy_stats.py
+=================
+
+Per‑domain success / latency bookkeeping for the PDFResolver strategies.
+
+Every strategy attempt is recorded against the landing domain.  When the
+resolver asks for an order, strategies are ranked by their smoothed success
+rate on that domain (``(successes + 1) / (attempts + 2)``, so untried ones
+still get a turn), then by mean latency, then by the resolver's default
+order.  A strategy that has failed ``strategy_skip_after`` times (env,
+default 20) on a domain without a single success is skipped, except for a
+``strategy_explore_rate`` share of calls (default 0.05) that re‑check it.
+
+Inspect the numbers with::
+
+    python -m functions_and_classes.strategy_stats [domain]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import threading
+from typing import List, Optional, Sequence
+
+from functions_and_classes.pdf_cache import cache_root
+
+
+class StrategyStats:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(cache_root, "strategy_stats.sqlite3")
+        self.skip_after = int(os.getenv("strategy_skip_after", 20))
+        self.explore_rate = float(os.getenv("strategy_explore_rate", 0.05))
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS strategy_stats ("
+            " domain TEXT NOT NULL, strategy TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, successes INTEGER NOT NULL DEFAULT 0,"
+            " total_seconds REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (domain, strategy))"
+        )
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def record(self, domain: str, strategy: str, success: bool, seconds: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO strategy_stats (domain, strategy, attempts, successes, total_seconds)"
+                " VALUES (?, ?, 1, ?, ?)"
+                " ON CONFLICT (domain, strategy) DO UPDATE SET"
+                " attempts = attempts + 1,"
+                " successes = successes + excluded.successes,"
+                " total_seconds = total_seconds + excluded.total_seconds",
+                (domain, strategy, int(success), seconds),
+            )
+
+    def order(self, domain: str, strategies: Sequence[str]) -> List[str]:
+        """Return *strategies* (given in default order) reordered and filtered for *domain*."""
+        with self._lock:
+            rows = {
+                row[0]: row[1:]
+                for row in self._db.execute(
+                    "SELECT strategy, attempts, successes, total_seconds FROM strategy_stats"
+                    " WHERE domain = ?",
+                    (domain,),
+                ).fetchall()
+            }
+
+        ranked = []
+        for index, name in enumerate(strategies):
+            attempts, successes, seconds = rows.get(name, (0, 0, 0.0))
+            if attempts >= self.skip_after and successes == 0 and random.random() >= self.explore_rate:
+                continue
+            rate = (successes + 1) / (attempts + 2)
+            latency = seconds / attempts if attempts else 0.0
+            ranked.append((-rate, latency, index, name))
+        return [name for *_, name in sorted(ranked)]
+
+    def snapshot(self, domain: Optional[str] = None) -> List[dict]:
+        query = "SELECT domain, strategy, attempts, successes, total_seconds FROM strategy_stats"
+        params: tuple = ()
+        if domain:
+            query += " WHERE domain = ?"
+            params = (domain,)
+        query += " ORDER BY domain, successes * 1.0 / attempts DESC"
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [
+            {
+                "domain": d,
+                "strategy": s,
+                "attempts": a,
+                "successes": ok,
+                "success_rate": ok / a if a else 0.0,
+                "mean_seconds": secs / a if a else 0.0,
+            }
+            for d, s, a, ok, secs in rows
+        ]
+
+
+strategy_stats = StrategyStats()
+
+
+if __name__ == "__main__":
+    domain_filter = sys.argv[1] if len(sys.argv) > 1 else None
+    print(f"{'domain':<32} {'strategy':<20} {'attempts':>8} {'success':>8} {'mean s':>8}")
+    for row in strategy_stats.snapshot(domain_filter):
+        print(
+            f"{row['domain']:<32} {row['strategy']:<20} {row['attempts']:>8} "
+            f"{row['success_rate']:>8.2f} {row['mean_seconds']:>8.1f}"
+        )
@@ -0,0 +1,242 @@
+"""
+title_index.py
+==============
+
+Local fuzzy title → DOI index over bioRxiv titles, so the s3 lookup stage
+only asks Crossref when the index has no convincing match.
+
+```python
+title_index.ensure_built()                      # from the bioRxiv mirror, once
+title_index.top_k("Single-cell atlas of ...", k=3)
+# [{"doi": "10.1101/2020.06.02.130062", "title": "...", "score": 0.91}, ...]
+info = title_index.best_match(title)            # same shape as crossref.article_info_from_title, or None
+```
+
+Titles are normalised (casefold, punctuation → space) and split into
+character trigrams; the score is the Jaccard similarity of the trigram sets.
+Queries use prefix filtering: a title scoring at least ``min_score`` must
+share one of the query's rarest trigrams, so overlaps are counted over the
+rare posting lists only (``title_index_posting_budget`` postings, default
+50k) and the few candidates that could still qualify are scored exactly.
+
+The index is built from biorxiv_mirror.py (latest version of each preprint)
+or from listing records via :meth:`TitleIndex.add_records`, and pickled to
+``<cache_dir>/title_index.pickle`` together with the mirror's signature so a
+restart only rebuilds after a details sync.  Records written back to the
+mirror between syncs are added with :meth:`add_records` and saved by
+:meth:`flush`.  ``title_match_threshold`` (env, default 0.75) is the score
+:meth:`best_match` accepts.
+"""
+
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from functions_and_classes.biorxiv_mirror import BiorxivMirror, biorxiv_mirror
+from functions_and_classes.metadata_cache import normalise_doi
+from functions_and_classes.pdf_cache import cache_root
+
+TITLE_MATCH_THRESHOLD = float(os.getenv("title_match_threshold", 0.75))
+
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalise(title: str) -> str:
+    return _NON_WORD_RE.sub(" ", title.casefold()).strip()
+
+
+def trigrams(title: str) -> Set[str]:
+    padded = f"  {normalise(title)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, path: Optional[str] = None, mirror: Optional[BiorxivMirror] = None):
+        self.path = path
+        self.mirror = mirror
+        self.titles: List[str] = []
+        self.dois: List[str] = []
+        self.postings: Dict[str, array] = {}
+        self.sizes = array("H")
+        self.posting_budget = int(os.getenv("title_index_posting_budget", 50_000))
+        self._doi_ids: Dict[str, int] = {}
+        self._rescore: Set[int] = set()
+        self._signature = None
+        self._built = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.dois)
+
+    # ------------------------------------------------------------------ #
+    # Building
+    # ------------------------------------------------------------------ #
+    def add(self, doi: str, title: str) -> bool:
+        """Index *title* under *doi*; False when there was nothing to change."""
+        if not doi or not title:
+            return False
+        if doi in self._doi_ids:
+            # Newer version of a title we already hold: keep the latest text.
+            # Trigrams it dropped stay posted, so its posting counts can run
+            # high; it is always rescored from the current title.
+            doc_id = self._doi_ids[doi]
+            if self.titles[doc_id] == title:
+                return False
+            old = trigrams(self.titles[doc_id])
+            self._rescore.add(doc_id)
+            self.titles[doc_id] = title
+        else:
+            doc_id = len(self.dois)
+            self._doi_ids[doi] = doc_id
+            self.dois.append(doi)
+            self.titles.append(title)
+            self.sizes.append(0)
+            old = set()
+        grams = trigrams(title)
+        self.sizes[doc_id] = min(len(grams), 0xFFFF)
+        for gram in grams - old:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = array("I")
+            posting.append(doc_id)
+        return True
+
+    def add_records(self, records: Iterable[dict]):
+        """Index bioRxiv listing records (``details`` or ``pubs`` shaped)."""
+        for record in records:
+            doi = record.get("doi") or record.get("preprint_doi") or record.get("biorxiv_doi")
+            title = record.get("title") or record.get("preprint_title")
+            if self.add(normalise_doi(doi) if doi else doi, title):
+                self._dirty = True
+
+    def _reset(self):
+        self.titles, self.dois, self.postings, self._doi_ids = [], [], {}, {}
+        self.sizes = array("H")
+        self._rescore = set()
+
+    def _load(self, signature) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logging.warning(f"[title_index] ignoring unreadable {self.path}: {exc}")
+            return False
+        if saved.get("signature") != signature:
+            return False
+        self.titles, self.dois, self.postings = saved["titles"], saved["dois"], saved["postings"]
+        self.sizes, self._rescore = saved["sizes"], saved["rescore"]
+        self._doi_ids = {doi: i for i, doi in enumerate(self.dois)}
+        return True
+
+    def _save(self, signature):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(
+                {"signature": signature, "titles": self.titles, "dois": self.dois, "postings": self.postings,
+                 "sizes": self.sizes, "rescore": self._rescore},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp, self.path)
+
+    def ensure_built(self) -> "TitleIndex":
+        """Load or (re)build from the mirror if it changed since the last build."""
+        if self.mirror is None:
+            return self
+        with self._lock:
+            signature = self.mirror.signature()
+            if self._built and signature == self._signature:
+                return self
+            started = time.perf_counter()
+            self._reset()
+            if self._load(signature):
+                how = "loaded"
+            else:
+                for doi, title in self.mirror.titles():
+                    self.add(doi, title)
+                self._save(signature)
+                how = "built"
+            self._signature = signature
+            self._built = True
+            self._dirty = False
+            logging.info(f"[title_index] {how} {len(self)} titles in {time.perf_counter() - started:.2f}s")
+        return self
+
+    def flush(self):
+        """Save titles added since the index was loaded or built."""
+        with self._lock:
+            if self._built and self._dirty:
+                self._save(self._signature)
+                self._dirty = False
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def top_k(self, title: str, k: int = 5, min_score: float = 0.5) -> List[dict]:
+        query = trigrams(title)
+        if not query or not self.postings:
+            return []
+
+        # Any title with Jaccard >= min_score shares >= ceil(min_score * |Q|)
+        # trigrams with the query, hence at least one of its rarest
+        # |Q| - ceil(min_score * |Q|) + 1.  Overlaps are counted over posting
+        # lists in rarity order, stopping once past that prefix and the
+        # posting budget; the very common trigrams left over are settled by
+        # rescoring the few candidates that could still qualify.
+        need = max(1, math.ceil(min_score * len(query)))
+        known = sorted((g for g in query if g in self.postings), key=lambda g: len(self.postings[g]))
+        if len(known) < need:
+            return []
+        prefix = len(query) - need + 1
+        counts = Counter()
+        counted = walked = 0
+        for gram in known:
+            if counted >= prefix and walked + len(self.postings[gram]) > self.posting_budget:
+                break
+            counts.update(self.postings[gram])
+            walked += len(self.postings[gram])
+            counted += 1
+        remaining = len(known) - counted
+
+        lo, hi = min_score * len(query), len(query) / min_score if min_score else float("inf")
+        scored = []
+        for doc_id, overlap in counts.items():
+            size = self.sizes[doc_id]
+            if overlap + remaining < need or not lo <= size <= hi:
+                continue
+            if remaining or doc_id in self._rescore:
+                doc = trigrams(self.titles[doc_id])
+                overlap, size = len(query & doc), len(doc)
+            score = overlap / (len(query) + size - overlap)
+            if score >= min_score:
+                scored.append((score, doc_id))
+
+        return [
+            {"doi": self.dois[doc_id], "title": self.titles[doc_id], "score": round(score, 4)}
+            for score, doc_id in heapq.nlargest(k, scored)
+        ]
+
+    def best_match(self, title: str, threshold: Optional[float] = None) -> Optional[dict]:
+        """Best match scoring at least *threshold*, shaped like a Crossref title lookup."""
+        threshold = TITLE_MATCH_THRESHOLD if threshold is None else threshold
+        matches = self.top_k(title, k=1, min_score=threshold)
+        if not matches:
+            return None
+        match = matches[0]
+        return {"title": title, "doi": match["doi"], "document_link": None, "score": match["score"]}
+
+
+title_index = TitleIndex(os.path.join(cache_root, "title_index.pickle"), mirror=biorxiv_mirror)
@@ -0,0 +1,172 @@
+"""
+ttl_cache.py
+============
+
+Small SQLite key/value store with per‑entry expiry, used for the resolver's
+DOI → landing URL cache and other network lookups worth keeping across runs.
+
+Values are JSON‑serialisable objects grouped by *namespace*:
+
+```python
+cache = SQLiteTTLCache(os.path.join(cache_root, "landing.sqlite3"))
+cache.put("doi_landing", doi, url, ttl=30 * 86400)
+url = cache.get("doi_landing", doi)        # None when missing or expired
+```
+
+Hit/miss counters are kept per namespace and reported by :meth:`stats`.
+
+With ``max_bytes`` set, least recently used entries are evicted down to 90%
+of the cap once it is exceeded.  The byte total is kept as a running count
+(re‑read from the table every ``RESYNC_EVERY`` writes, since other processes
+may share the file) and a hit refreshes ``last_access`` at most every
+``TOUCH_INTERVAL`` seconds, so neither reads nor writes scan the table.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+MISSING = object()
+
+TOUCH_INTERVAL = 300
+RESYNC_EVERY = 1000
+EVICT_BATCH = 256
+
+
+class SQLiteTTLCache:
+    def __init__(self, path: str, max_bytes: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._connect()
+        os.register_at_fork(after_in_child=self._connect)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL, size INTEGER NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def _connect(self):
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self._writes = 0
+        self._db = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def lookup(self, namespace: str, key: str) -> Any:
+        """Return the stored value, or :data:`MISSING` so a cached ``None`` can be told apart."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at, size, last_access FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._db.execute(
+                        "DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                    )
+                    if self._total_bytes is not None:
+                        self._total_bytes -= row[2]
+                self.misses[namespace] += 1
+                return MISSING
+            if self.max_bytes is not None and now - row[3] > TOUCH_INTERVAL:
+                self._db.execute(
+                    "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key),
+                )
+            self.hits[namespace] += 1
+            return json.loads(row[0])
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        value = self.lookup(namespace, key)
+        return default if value is MISSING else value
+
+    def put(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """Store *value*; *ttl* is in seconds, ``None`` keeps it until evicted."""
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            old = None
+            if self.max_bytes is not None:
+                old = self._db.execute(
+                    "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+                ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, now + ttl if ttl is not None else None, len(payload), now),
+            )
+            if self.max_bytes is not None:
+                self._writes += 1
+                if self._total_bytes is None or self._writes % RESYNC_EVERY == 0:
+                    self._total_bytes = self._sum_sizes()
+                else:
+                    self._total_bytes += len(payload) - (old[0] if old else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+
+    def invalidate(self, namespace: Optional[str] = None):
+        with self._lock:
+            if namespace is None:
+                self._db.execute("DELETE FROM entries")
+            else:
+                self._db.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self._total_bytes = None
+
+    def purge_expired(self) -> int:
+        """Delete expired entries; returns how many went."""
+        with self._lock:
+            deleted = self._db.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+            ).rowcount
+            self._total_bytes = None
+        return deleted
+
+    def _sum_sizes(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        # Oldest first, in batches, down to a low-water mark so the next few
+        # puts don't evict again.
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._db.execute(
+                "SELECT namespace, key, size FROM entries ORDER BY last_access ASC LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            self._db.execute("BEGIN")
+            for namespace, key, size in rows:
+                self._db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+            self._db.execute("COMMIT")
+
+    def stats(self) -> dict:
+        report = {}
+        for namespace in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[namespace], self.misses[namespace]
+            report[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        return report